@@ -0,0 +1,35 @@
+"""
+Ahead-of-time build of the trading kernels
+Compiles core/kernels.py into the `adaptron_kernels` extension module so
+live trading and CI processes skip numba's JIT warm-up
+
+Usage:
+    python core/_kernels_aot.py
+"""
+
+import os
+import sys
+
+import numpy as np
+from numba.pycc import CC
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.kernels import _execute_trade_nb, _calc_reward_nb, _replay_rewards_nb
+
+cc = CC('adaptron_kernels')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.verbose = True
+
+cc.export('execute_trade', 'UniTuple(f8, 3)(f8, f8, f8, f8, f8, f8)')(_execute_trade_nb.py_func)
+cc.export('calc_reward', 'UniTuple(f8, 2)(i8, f8, f8, f8, f8, f8, f8, f8)')(_calc_reward_nb.py_func)
+
+
+@cc.export('replay_rewards', 'f8[:](f8[:], f8[:], f8, f8, f8)')
+def replay_rewards(actions, prices, transaction_cost, initial_balance, max_position_size):
+    out = np.empty_like(actions)
+    _replay_rewards_nb(actions, prices, transaction_cost, initial_balance, max_position_size, out)
+    return out
+
+
+if __name__ == "__main__":
+    cc.compile()
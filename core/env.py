@@ -2,7 +2,7 @@ import gymnasium as gym
 import numpy as np
 import pandas as pd
 from gymnasium import spaces
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 class StockTradingEnv(gym.Env):
     """
@@ -17,7 +17,9 @@ class StockTradingEnv(gym.Env):
                  df: pd.DataFrame, 
                  initial_balance: float = 100000.0,
                  transaction_cost: float = 0.001,  # 0.1% per trade
-                 max_position_size: float = 1.0):  # Maximum 100% of portfolio
+                 max_position_size: float = 1.0,   # Maximum 100% of portfolio
+                 features: Optional[np.ndarray] = None,  # Precomputed build_features(df)
+                 prices: Optional[np.ndarray] = None):   # Precomputed build_prices(df)
         super(StockTradingEnv, self).__init__()
         
         self.df = df.reset_index(drop=True)
@@ -26,6 +28,22 @@ class StockTradingEnv(gym.Env):
         self.max_position_size = max_position_size
         self.current_step = 0
         
+        # Per-step data as contiguous arrays, so step() never builds a pandas row.
+        # The feature matrix is read-only, so envs over the same data can share one.
+        if features is None:
+            features = self.build_features(self.df)
+        elif features.shape != self.df.shape:
+            raise ValueError(f"features shape {features.shape} does not match df shape {self.df.shape}")
+        self._obs_matrix = features
+        self._n_market = self._obs_matrix.shape[1]
+        self._state_buf = np.empty(self._n_market + 4, dtype=np.float32)
+        if prices is None:
+            prices = self.build_prices(self.df)
+        elif len(prices) != len(self.df):
+            raise ValueError(f"prices length {len(prices)} does not match df length {len(self.df)}")
+        self._prices = prices
+        self._n_steps = len(self.df)
+        
         # Action space: continuous from -1 to 1
         # -1 = sell all, 0 = hold, 1 = buy all
         self.action_space = spaces.Box(low=-1, high=1, shape=(1,), dtype=np.float32)
@@ -44,6 +62,26 @@ class StockTradingEnv(gym.Env):
         
         self.reset()
     
+    @staticmethod
+    def build_features(df: pd.DataFrame) -> np.ndarray:
+        """
+        Convert a prepared DataFrame into the env's market feature matrix
+        
+        Built straight into float32 (no float64 interleave of the mixed-dtype frame),
+        row-major so each step reads one contiguous row; NaN/inf are cleaned
+        once here instead of on every observation.
+        """
+        return np.nan_to_num(
+            np.ascontiguousarray(df.to_numpy(dtype=np.float32)),
+            copy=False, nan=0.0, posinf=0.0, neginf=0.0
+        )
+    
+    @staticmethod
+    def build_prices(df: pd.DataFrame) -> np.ndarray:
+        """Denormalized close prices the env trades at (Original_Close, else Close), as float64"""
+        price_col = 'Original_Close' if 'Original_Close' in df.columns else 'Close'
+        return df[price_col].to_numpy(dtype=np.float64)
+    
     def reset(self, seed=None, options=None):
         """Reset environment to initial state"""
         super().reset(seed=seed)
@@ -56,16 +94,20 @@ class StockTradingEnv(gym.Env):
         self.total_trades = 0
         self.net_worth = self.initial_balance
         self.max_net_worth = self.initial_balance
-        self.returns = []
-        self.portfolio_values = [self.initial_balance]
+        
+        # Preallocated equity curve: portfolio_values[i] is the value after i steps
+        self.portfolio_values = np.empty(self._n_steps, dtype=np.float64)
+        self.portfolio_values[0] = self.initial_balance
+        
+        # Running (Welford) mean/variance of per-step returns for the episode Sharpe ratio
+        self._ret_n = 0
+        self._ret_mean = 0.0
+        self._ret_M2 = 0.0
         
         return self._get_observation(), {}
     
     def _get_observation(self):
         """Get current state observation"""
-        # Get market features
-        market_obs = self.df.iloc[self.current_step].values
-        
         # Get current price (denormalized)
         current_price = self._get_current_price()
         
@@ -78,24 +120,21 @@ class StockTradingEnv(gym.Env):
         shares_value_normalized = (self.shares_held * current_price) / self.initial_balance
         portfolio_normalized = portfolio_value / self.initial_balance
         
-        # Combine observations
-        portfolio_obs = np.array([
-            balance_normalized,
-            shares_value_normalized,
-            portfolio_normalized,
-            position_ratio
-        ])
+        # Combine market features and portfolio state in the scratch buffer
+        buf = self._state_buf
+        buf[:self._n_market] = self._obs_matrix[self.current_step]
+        buf[-4] = balance_normalized
+        buf[-3] = shares_value_normalized
+        buf[-2] = portfolio_normalized
+        buf[-1] = position_ratio
         
-        obs = np.concatenate([market_obs, portfolio_obs])
-        return obs.astype(np.float32)
+        # Copy out: vec envs keep terminal observations across the next reset
+        return buf.copy()
     
     def _get_current_price(self):
         """Get the actual (denormalized) current price"""
-        if 'Original_Close' in self.df.columns:
-            return self.df.iloc[self.current_step]['Original_Close']
-        else:
-            # If no original close, use normalized close (not ideal but fallback)
-            return self.df.iloc[self.current_step]['Close']
+        # Falls back to the normalized Close if there is no Original_Close (not ideal)
+        return self._prices[self.current_step]
     
     def _execute_trade(self, action: float, current_price: float):
         """
@@ -159,7 +198,7 @@ class StockTradingEnv(gym.Env):
         current_portfolio_value = self.balance + (self.shares_held * current_price)
         
         # 1. Main reward: Portfolio value change
-        prev_portfolio_value = self.portfolio_values[-1] if self.portfolio_values else self.initial_balance
+        prev_portfolio_value = self.portfolio_values[self.current_step]
         portfolio_return = (current_portfolio_value - prev_portfolio_value) / prev_portfolio_value
         
         # Scale by 100 for better gradients (positive when portfolio grows, negative when shrinks)
@@ -170,7 +209,7 @@ class StockTradingEnv(gym.Env):
         
         # 3. Bonus for beating market (only reward, never penalize)
         # Check every 50 steps to avoid noisy short-term comparisons
-        if len(self.portfolio_values) > 50 and self.current_step % 50 == 0:
+        if self.current_step >= 50 and self.current_step % 50 == 0:
             market_return = (current_price / self._get_price_at_step(0)) - 1
             portfolio_total_return = (current_portfolio_value / self.initial_balance) - 1
             
@@ -188,10 +227,7 @@ class StockTradingEnv(gym.Env):
     
     def _get_price_at_step(self, step: int) -> float:
         """Get price at a specific step"""
-        if 'Original_Close' in self.df.columns:
-            return self.df.iloc[step]['Original_Close']
-        else:
-            return self.df.iloc[step]['Close']
+        return self._prices[step]
     
     def step(self, action: np.ndarray) -> Tuple[np.ndarray, float, bool, Dict]:
         """Execute one step in the environment"""
@@ -205,16 +241,19 @@ class StockTradingEnv(gym.Env):
         
         # Calculate reward
         reward = self._calculate_reward(transaction_cost)
-        self.returns.append(reward)
+        self._ret_n += 1
+        delta = reward - self._ret_mean
+        self._ret_mean += delta / self._ret_n
+        self._ret_M2 += delta * (reward - self._ret_mean)
         
         # Update portfolio tracking
         current_portfolio_value = self.balance + (self.shares_held * current_price)
-        self.portfolio_values.append(current_portfolio_value)
+        self.portfolio_values[self.current_step + 1] = current_portfolio_value
         self.net_worth = current_portfolio_value
         
         # Move to next step
         self.current_step += 1
-        done = self.current_step >= len(self.df) - 1
+        done = self.current_step >= self._n_steps - 1
         
         # Calculate info metrics
         info = {}
@@ -223,17 +262,17 @@ class StockTradingEnv(gym.Env):
             initial_price = self._get_price_at_step(0)
             
             # Calculate returns
-            returns_array = np.array(self.returns)
             total_return = (final_value - self.initial_balance) / self.initial_balance
             
-            # Calculate Sharpe ratio
-            if len(returns_array) > 1 and np.std(returns_array) > 0:
-                sharpe_ratio = np.mean(returns_array) / np.std(returns_array) * np.sqrt(252)
+            # Calculate Sharpe ratio (population std, from the running accumulators)
+            returns_std = np.sqrt(self._ret_M2 / self._ret_n)
+            if self._ret_n > 1 and returns_std > 0:
+                sharpe_ratio = self._ret_mean / returns_std * np.sqrt(252)
             else:
                 sharpe_ratio = 0
             
             # Calculate max drawdown
-            portfolio_values_array = np.array(self.portfolio_values)
+            portfolio_values_array = self.portfolio_values[:self.current_step + 1]
             cumulative_max = np.maximum.accumulate(portfolio_values_array)
             drawdowns = (portfolio_values_array - cumulative_max) / cumulative_max
             max_drawdown = np.min(drawdowns)
@@ -0,0 +1,328 @@
+"""
+Technical Indicator Kernels
+Numba-compiled rolling/recursive indicators shared by the data modules
+
+Each kernel takes a float64 array and returns a float64 array of the same
+length, with NaN during the warm-up period (same conventions as the `ta`
+library, so features are unchanged).
+
+compute_indicators() is the single feature pipeline used by every data source.
+"""
+
+import numpy as np
+import pandas as pd
+from numba import njit
+
+# Fast-math without 'nnan'/'ninf' (warm-up values are NaN) or 'reassoc' (keeps summation order)
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn'}
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def sma(x, window):
+    """
+    Simple moving average via a running window sum
+    
+    NaNs are counted instead of summed, so a window containing one is NaN
+    (as with rolling(window).mean()) and the average recovers once it leaves.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    nans = 0
+    for i in range(n):
+        v = x[i]
+        if np.isnan(v):
+            nans += 1
+        else:
+            total += v
+        if i >= window:
+            old = x[i - window]
+            if np.isnan(old):
+                nans -= 1
+            else:
+                total -= old
+        if i >= window - 1 and nans == 0:
+            out[i] = total / window
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _ewm(x, alpha, min_periods):
+    """Exponentially weighted mean (pandas ewm(adjust=False)), skipping leading NaNs"""
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    avg = 0.0
+    count = 0
+    for i in range(n):
+        v = x[i]
+        if not np.isnan(v):
+            if count == 0:
+                avg = v
+            else:
+                avg = avg * (1.0 - alpha) + v * alpha
+            count += 1
+        if count >= min_periods:
+            out[i] = avg
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def ema(x, span):
+    """Exponential moving average with alpha = 2 / (span + 1)"""
+    return _ewm(x, 2.0 / (span + 1.0), span)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def rsi_wilder(x, window=14):
+    """Relative Strength Index with Wilder smoothing of average gain/loss"""
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    # Single multiply-add recurrence per accumulator (contracts to FMA)
+    alpha = 1.0 / window
+    keep = 1.0 - alpha
+    # The first bar has no prior close and counts as a zero move
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, n):
+        d = x[i] - x[i - 1]
+        gain = d if d > 0 else 0.0
+        loss = -d if d < 0 else 0.0
+        avg_gain = avg_gain * keep + gain * alpha
+        avg_loss = avg_loss * keep + loss * alpha
+        if i >= window - 1:
+            if avg_loss == 0:
+                out[i] = 100.0
+            else:
+                out[i] = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return out
+
+
+@njit(cache=True)
+def zscore_inplace(values):
+    """
+    Z-score each column in place (sample std, ddof=1) and replace NaNs with 0
+    
+    Serial on purpose: the frames are small, and the live traders prepare
+    several symbols from concurrent threads, which numba's workqueue
+    threading layer refuses to run parallel kernels from. NaNs are ignored
+    when computing the statistics, which accumulate in float64 for float32
+    inputs too. Pass a Fortran-ordered array so each column is contiguous.
+    
+    Returns:
+        (mean, std) per column, with the 1e-8 epsilon already added to std
+    """
+    n, n_cols = values.shape
+    mean = np.zeros(n_cols)
+    std = np.zeros(n_cols)
+    for c in range(n_cols):
+        total = 0.0
+        count = 0
+        for r in range(n):
+            v = values[r, c]
+            if not np.isnan(v):
+                total += v
+                count += 1
+        m = total / count if count > 0 else 0.0
+        
+        sq = 0.0
+        for r in range(n):
+            v = values[r, c]
+            if not np.isnan(v):
+                sq += (v - m) * (v - m)
+        sd = (np.sqrt(sq / (count - 1)) if count > 1 else 0.0) + 1e-8
+        
+        for r in range(n):
+            v = values[r, c]
+            values[r, c] = 0.0 if np.isnan(v) else (v - m) / sd
+        mean[c] = m
+        std[c] = sd
+    return mean, std
+
+
+@njit(cache=True)
+def zscore_apply_inplace(values, mean, std):
+    """Apply previously computed zscore_inplace statistics (NaNs become 0)"""
+    n, n_cols = values.shape
+    for c in range(n_cols):
+        m = mean[c]
+        sd = std[c]
+        for r in range(n):
+            v = values[r, c]
+            values[r, c] = 0.0 if np.isnan(v) else (v - m) / sd
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def wilder_atr(high, low, close, window=14):
+    """ATR seeded with the mean of the first `window` true ranges (0 before that, as in `ta`)"""
+    n = close.shape[0]
+    out = np.zeros(n)
+    if n < window:
+        return out
+    alpha = 1.0 / window
+    keep = 1.0 - alpha
+    atr = 0.0
+    for i in range(n):
+        # The first bar has no prior close, so its true range is just high - low
+        tr = high[i] - low[i]
+        if i > 0:
+            tr = max(tr, abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        if i < window:
+            atr += tr / window
+            if i == window - 1:
+                out[i] = atr
+        else:
+            atr = atr * keep + tr * alpha
+            out[i] = atr
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def adx(high, low, close, window=14):
+    """Average Directional Index with `ta`'s seeding (0 for the first 2 * window - 1 bars)"""
+    n = close.shape[0]
+    out = np.zeros(n)
+    if n < 2 * window:
+        return out
+    alpha = 1.0 / window
+    keep = 1.0 - alpha
+    
+    # Wilder averages of directional range and +/- movement, seeded from bars 1..window
+    tr_avg = 0.0
+    pos_avg = 0.0
+    neg_avg = 0.0
+    dx_seed = 0.0
+    adx_val = 0.0
+    for i in range(1, n):
+        tr = max(high[i], close[i - 1]) - min(low[i], close[i - 1])
+        up = high[i] - high[i - 1]
+        down = low[i - 1] - low[i]
+        pos = up if (up > down and up > 0) else 0.0
+        neg = down if (down > up and down > 0) else 0.0
+        if i <= window:
+            tr_avg += tr / window
+            pos_avg += pos / window
+            neg_avg += neg / window
+            if i < window:
+                continue
+        else:
+            tr_avg = tr_avg * keep + tr * alpha
+            pos_avg = pos_avg * keep + pos * alpha
+            neg_avg = neg_avg * keep + neg * alpha
+        
+        di_pos = 100.0 * (pos_avg / tr_avg) if tr_avg != 0 else 0.0
+        di_neg = 100.0 * (neg_avg / tr_avg) if tr_avg != 0 else 0.0
+        di_sum = di_pos + di_neg
+        dx = 100.0 * abs((di_pos - di_neg) / di_sum) if di_sum != 0 else 0.0
+        
+        # ADX starts as the mean DX of bars window..2*window-1, then Wilder-smooths
+        if i < 2 * window:
+            dx_seed += dx / window
+            if i == 2 * window - 1:
+                adx_val = dx_seed
+                out[i] = adx_val
+        else:
+            adx_val = adx_val * keep + dx * alpha
+            out[i] = adx_val
+    return out
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def _compute(high, low, close, volume):
+    """All recursive/rolling kernels in one compiled call"""
+    ema_12 = ema(close, 12)
+    ema_26 = ema(close, 26)
+    macd = ema_12 - ema_26
+    return (
+        sma(close, 5), sma(close, 10), sma(close, 20), sma(close, 50), sma(close, 200),
+        ema_12, ema_26,
+        rsi_wilder(close, 14),
+        macd, ema(macd, 9),
+        wilder_atr(high, low, close, 14),
+        sma(volume, 20),
+        adx(high, low, close, 14),
+    )
+
+
+def compute_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the full technical indicator feature set
+    
+    Args:
+        df: DataFrame with OHLCV data
+        
+    Returns:
+        DataFrame with indicators added and warm-up rows dropped
+    """
+    high = df['High'].to_numpy(dtype=np.float64)
+    low = df['Low'].to_numpy(dtype=np.float64)
+    close = df['Close'].to_numpy(dtype=np.float64)
+    volume = df['Volume'].to_numpy(dtype=np.float64)
+    (sma_5, sma_10, sma_20, sma_50, sma_200, ema_12, ema_26,
+     rsi, macd, macd_signal, atr, volume_sma, adx_14) = _compute(high, low, close, volume)
+    
+    close_s = df['Close']
+    new = {}
+    
+    # Moving Averages
+    new['SMA_5'] = sma_5
+    new['SMA_10'] = sma_10
+    new['SMA_20'] = sma_20
+    new['SMA_50'] = sma_50
+    new['SMA_200'] = sma_200
+    
+    # EMA
+    new['EMA_12'] = ema_12
+    new['EMA_26'] = ema_26
+    
+    # RSI
+    new['RSI'] = rsi
+    
+    # MACD
+    new['MACD'] = macd
+    new['MACD_Signal'] = macd_signal
+    new['MACD_Diff'] = macd - macd_signal
+    
+    # Bollinger Bands (one rolling window for mean and std)
+    rolling_20 = close_s.rolling(20, min_periods=20)
+    bb_middle = rolling_20.mean().to_numpy()
+    bb_std = rolling_20.std(ddof=0).to_numpy()
+    new['BB_Upper'] = bb_middle + 2 * bb_std
+    new['BB_Lower'] = bb_middle - 2 * bb_std
+    new['BB_Middle'] = bb_middle
+    new['BB_Width'] = (new['BB_Upper'] - new['BB_Lower']) / bb_middle
+    
+    # ATR (Average True Range)
+    new['ATR'] = atr
+    
+    # Volume indicators
+    new['Volume_SMA'] = volume_sma
+    # Zero volume / flat windows give inf or NaN (as in `ta`), without the RuntimeWarning
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new['Volume_Ratio'] = volume / volume_sma
+    
+    # Stochastic Oscillator
+    lowest_14 = df['Low'].rolling(14, min_periods=14).min().to_numpy()
+    highest_14 = df['High'].rolling(14, min_periods=14).max().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        stoch_k = 100 * (close - lowest_14) / (highest_14 - lowest_14)
+    new['Stoch_K'] = stoch_k
+    new['Stoch_D'] = pd.Series(stoch_k).rolling(3, min_periods=3).mean().to_numpy()
+    
+    # Price Rate of Change
+    close_10 = close_s.shift(10).to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new['ROC'] = (close - close_10) / close_10 * 100
+    
+    # ADX (Average Directional Index)
+    new['ADX'] = adx_14
+    
+    # Returns
+    close_1 = close_s.shift(1).to_numpy()
+    new['Returns'] = close / close_1 - 1
+    new['Log_Returns'] = np.log(close / close_1)
+    
+    # One block for all indicator columns instead of one insert (and copy) per column
+    df = pd.concat([df, pd.DataFrame(new, index=df.index)], axis=1)
+    
+    # Drop NaN values
+    return df.dropna()
@@ -0,0 +1,139 @@
+"""
+Compiled Trading Kernels
+Numba versions of the StockTradingEnv trade/reward logic for offline replay
+
+Features:
+- Scalar trade execution and reward kernels (same rules as core/env.py)
+- Batched reward replay over (N envs, T steps) without Python loops
+  (e.g. transaction-cost sweeps, policy sensitivity analysis)
+
+Run `python core/_kernels_aot.py` once to build the ahead-of-time compiled
+`adaptron_kernels` extension; replay_rewards() uses it when present and
+falls back to JIT compilation otherwise.
+"""
+
+import numpy as np
+from numba import njit, guvectorize
+
+try:
+    from . import adaptron_kernels as _aot
+except ImportError:
+    _aot = None
+
+
+@njit(cache=True)
+def _execute_trade_nb(balance, shares, action, price, transaction_cost, max_position_size):
+    """
+    Execute a trade for a continuous action (mirrors StockTradingEnv._execute_trade)
+
+    Returns:
+        (balance, shares, transaction_fee)
+    """
+    if action > 0:
+        buy_amount = balance * min(abs(action), max_position_size)
+        shares_to_buy = float(int(buy_amount / price))
+
+        if shares_to_buy > 0:
+            cost = shares_to_buy * price
+            fee = cost * transaction_cost
+            if cost + fee <= balance:
+                return balance - (cost + fee), shares + shares_to_buy, fee
+
+    elif action < 0 and shares > 0:
+        sell_ratio = min(abs(action), 1.0)
+        shares_to_sell = float(int(shares * sell_ratio))
+
+        if shares_to_sell > 0:
+            revenue = shares_to_sell * price
+            fee = revenue * transaction_cost
+            return balance + (revenue - fee), shares - shares_to_sell, fee
+
+    return balance, shares, 0.0
+
+
+@njit(cache=True)
+def _calc_reward_nb(step, portfolio_value, prev_portfolio_value, max_net_worth,
+                    fee, price, initial_price, initial_balance):
+    """
+    Reward for one step (mirrors StockTradingEnv._calculate_reward)
+
+    Returns:
+        (reward, max_net_worth)
+    """
+    reward = (portfolio_value - prev_portfolio_value) / prev_portfolio_value * 100
+    reward -= (fee / initial_balance) * 2
+
+    # Outperformance bonus every 50 steps, from step 50 onwards
+    if step >= 50 and step % 50 == 0:
+        market_return = (price / initial_price) - 1
+        portfolio_total_return = (portfolio_value / initial_balance) - 1
+        if portfolio_total_return > market_return:
+            reward += (portfolio_total_return - market_return) * 20
+
+    if portfolio_value > max_net_worth:
+        max_net_worth = portfolio_value
+        reward += 0.5
+
+    return reward, max_net_worth
+
+
+@njit(cache=True)
+def _replay_rewards_nb(actions, prices, transaction_cost, initial_balance, max_position_size, out):
+    """Replay one episode, writing the per-step environment reward into `out`"""
+    balance = initial_balance
+    shares = 0.0
+    prev_value = initial_balance
+    max_net_worth = initial_balance
+
+    for t in range(actions.shape[0]):
+        price = prices[t]
+        balance, shares, fee = _execute_trade_nb(
+            balance, shares, actions[t], price, transaction_cost, max_position_size
+        )
+        value = balance + shares * price
+        out[t], max_net_worth = _calc_reward_nb(
+            t, value, prev_value, max_net_worth, fee, price, prices[0], initial_balance
+        )
+        prev_value = value
+
+
+@guvectorize(['void(f8[:], f8[:], f8, f8, f8, f8[:])'],
+             '(t),(t),(),(),()->(t)', target='parallel')
+def batched_reward(actions, prices, transaction_cost, initial_balance, max_position_size, out):
+    """
+    Replay an episode and write the per-step environment reward
+
+    Broadcasts over leading dimensions, so (N, T) actions/prices give (N, T)
+    rewards with the N episodes replayed in parallel.
+
+    Args:
+        actions: Actions in [-1, 1] for each step
+        prices: Actual (denormalized) prices for each step
+        transaction_cost: Transaction cost rate
+        initial_balance: Starting cash
+        max_position_size: Maximum fraction of balance per buy
+        out: Per-step rewards
+    """
+    _replay_rewards_nb(actions, prices, transaction_cost, initial_balance, max_position_size, out)
+
+
+def replay_rewards(actions: np.ndarray,
+                   prices: np.ndarray,
+                   transaction_cost: float = 0.001,
+                   initial_balance: float = 100000.0,
+                   max_position_size: float = 1.0) -> np.ndarray:
+    """
+    Replay a single episode and return the per-step environment rewards
+
+    Uses the AOT-compiled extension when it has been built, so there is no
+    JIT warm-up on first call.
+    """
+    actions = np.ascontiguousarray(actions, dtype=np.float64)
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+
+    if _aot is not None:
+        return _aot.replay_rewards(actions, prices, transaction_cost, initial_balance, max_position_size)
+
+    out = np.empty_like(actions)
+    _replay_rewards_nb(actions, prices, transaction_cost, initial_balance, max_position_size, out)
+    return out
@@ -15,16 +15,15 @@ import logging
 import json
 import os
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 from collections import deque
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import numpy as np
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+_SQRT_252 = np.sqrt(252)
+
 
 class PerformanceMonitor:
     """Track trading performance metrics"""
@@ -32,16 +31,27 @@ class PerformanceMonitor:
     def __init__(self, initial_capital: float = 100000.0):
         self.initial_capital = initial_capital
         self.trades = []
-        self.equity_curve = []
-        self.daily_returns = []
+        
+        # Equity curve and trade P&L live in preallocated buffers (grown by doubling)
+        self._eq_time = np.empty(1024, dtype=np.int64)  # epoch nanoseconds
+        self._eq_value = np.empty(1024, dtype=np.float64)
+        self._ne = 0
+        self._trade_pnl = np.empty(256, dtype=np.float64)
+        self._nt = 0
         
         self.peak_equity = initial_capital
         self.max_drawdown = 0.0
         
         self.wins = 0
         self.losses = 0
+        self.win_rate = 0.0
         self.total_pnl = 0.0
         
+        # Running (Welford) statistics of daily returns
+        self._ret_n = 0
+        self._ret_mean = 0.0
+        self._ret_M2 = 0.0
+        
     def add_trade(self, trade: Dict):
         """Record a trade"""
         self.trades.append({
@@ -52,17 +62,32 @@ class PerformanceMonitor:
         pnl = trade.get('pnl', 0)
         self.total_pnl += pnl
         
+        if self._nt == len(self._trade_pnl):
+            self._trade_pnl = np.resize(self._trade_pnl, 2 * self._nt)
+        self._trade_pnl[self._nt] = pnl
+        self._nt += 1
+        
         if pnl > 0:
             self.wins += 1
         elif pnl < 0:
             self.losses += 1
+        self.win_rate = self.wins / self._nt
+    
+    def add_return(self, daily_return: float):
+        """Record a daily return (updates running mean/variance)"""
+        self._ret_n += 1
+        delta = daily_return - self._ret_mean
+        self._ret_mean += delta / self._ret_n
+        self._ret_M2 += delta * (daily_return - self._ret_mean)
     
     def update_equity(self, current_value: float):
         """Update equity curve"""
-        self.equity_curve.append({
-            'timestamp': datetime.now(),
-            'value': current_value
-        })
+        if self._ne == len(self._eq_value):
+            self._eq_time = np.resize(self._eq_time, 2 * self._ne)
+            self._eq_value = np.resize(self._eq_value, 2 * self._ne)
+        self._eq_time[self._ne] = time.time_ns()
+        self._eq_value[self._ne] = current_value
+        self._ne += 1
         
         # Update peak and drawdown
         if current_value > self.peak_equity:
@@ -73,25 +98,19 @@ class PerformanceMonitor:
             self.max_drawdown = drawdown
     
     def get_metrics(self) -> Dict:
-        """Calculate performance metrics"""
-        total_trades = len(self.trades)
-        win_rate = self.wins / total_trades if total_trades > 0 else 0
-        
-        current_equity = self.equity_curve[-1]['value'] if self.equity_curve else self.initial_capital
+        """Get performance metrics (constant time, from running totals)"""
+        current_equity = self._eq_value[self._ne - 1] if self._ne else self.initial_capital
         total_return = (current_equity - self.initial_capital) / self.initial_capital
         
-        # Calculate Sharpe ratio (simplified)
-        if len(self.daily_returns) > 0:
-            returns = np.array(self.daily_returns)
-            sharpe = returns.mean() / returns.std() * np.sqrt(252) if returns.std() > 0 else 0
-        else:
-            sharpe = 0
+        # Sharpe ratio (simplified, population std of daily returns)
+        ret_std = np.sqrt(self._ret_M2 / self._ret_n) if self._ret_n > 0 else 0.0
+        sharpe = self._ret_mean / ret_std * _SQRT_252 if ret_std > 0 else 0
         
         return {
-            'total_trades': total_trades,
+            'total_trades': self._nt,
             'wins': self.wins,
             'losses': self.losses,
-            'win_rate': win_rate,
+            'win_rate': self.win_rate,
             'total_pnl': self.total_pnl,
             'total_return': total_return,
             'current_equity': current_equity,
@@ -99,6 +118,14 @@ class PerformanceMonitor:
             'sharpe_ratio': sharpe,
             'peak_equity': self.peak_equity
         }
+    
+    def get_equity_curve(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get equity curve as (timestamps in epoch ns, values) array views"""
+        return self._eq_time[:self._ne], self._eq_value[:self._ne]
+    
+    def get_trade_pnl(self) -> np.ndarray:
+        """Get per-trade P&L as an array view"""
+        return self._trade_pnl[:self._nt]
 
 
 class HealthMonitor:
@@ -233,22 +260,68 @@ class AlertManager:
         self.email_config = email_config
         self.telegram_config = telegram_config
         
-        self.alert_history = deque(maxlen=100)
-        self.last_alert_time = {}
-        self.min_alert_interval = 300  # 5 minutes between similar alerts
+        # Alert history: ring buffer of the last `max_history` alerts in parallel arrays
+        self.max_history = 100
+        self._alert_ts = np.empty(self.max_history, dtype=np.int64)  # epoch nanoseconds
+        self._alert_type_id = np.empty(self.max_history, dtype=np.int16)
+        self._alert_sev = np.empty(self.max_history, dtype=np.int8)
+        self._alert_msg = [''] * self.max_history
+        self._n_alerts = 0
+        
+        # Interned alert types / severities (name <-> small integer id)
+        self._type_ids = {}
+        self._type_names = []
+        self._sev_ids = {}
+        self._sev_names = []
+        
+        self.last_alert_time = {}  # {alert_type: time.monotonic_ns() of last alert}
+        self.min_alert_interval_ns = 300 * 1_000_000_000  # 5 minutes between similar alerts
         
     def should_send_alert(self, alert_type: str) -> bool:
         """Rate limit alerts to avoid spam"""
-        now = datetime.now()
+        now_ns = time.monotonic_ns()
         
-        if alert_type in self.last_alert_time:
-            time_since_last = (now - self.last_alert_time[alert_type]).total_seconds()
-            if time_since_last < self.min_alert_interval:
-                return False
+        last = self.last_alert_time.get(alert_type)
+        if last is not None and now_ns - last < self.min_alert_interval_ns:
+            return False
         
-        self.last_alert_time[alert_type] = now
+        self.last_alert_time[alert_type] = now_ns
         return True
     
+    def _intern(self, ids: Dict, names: List, name: str) -> int:
+        """Map a name to a stable small integer id"""
+        idx = ids.get(name)
+        if idx is None:
+            idx = ids[name] = len(names)
+            names.append(name)
+        return idx
+    
+    def _record_alert(self, alert_type: str, severity: str, message: str):
+        """Append alert to the history ring buffer"""
+        i = self._n_alerts % self.max_history
+        self._alert_ts[i] = time.time_ns()
+        self._alert_type_id[i] = self._intern(self._type_ids, self._type_names, alert_type)
+        self._alert_sev[i] = self._intern(self._sev_ids, self._sev_names, severity)
+        self._alert_msg[i] = message
+        self._n_alerts += 1
+    
+    def get_alert_history(self, limit: Optional[int] = None) -> List[Dict]:
+        """Get recorded alerts (oldest first), optionally only the last `limit`"""
+        count = min(self._n_alerts, self.max_history)
+        if limit is not None:
+            count = min(count, limit)
+        
+        history = []
+        for n in range(self._n_alerts - count, self._n_alerts):
+            i = n % self.max_history
+            history.append({
+                'timestamp': datetime.fromtimestamp(self._alert_ts[i] / 1e9),
+                'type': self._type_names[self._alert_type_id[i]],
+                'severity': self._sev_names[self._alert_sev[i]],
+                'message': self._alert_msg[i]
+            })
+        return history
+    
     def send_email(self, subject: str, body: str):
         """Send email alert"""
         if not self.email_config:
@@ -256,6 +329,11 @@ class AlertManager:
             return
         
         try:
+            # Imported lazily: alerts are rare and every env worker imports this module
+            import smtplib
+            from email.mime.text import MIMEText
+            from email.mime.multipart import MIMEMultipart
+            
             msg = MIMEMultipart()
             msg['From'] = self.email_config['username']
             msg['To'] = self.email_config['to_email']
@@ -312,12 +390,7 @@ class AlertManager:
         if not self.should_send_alert(alert_type):
             return
         
-        self.alert_history.append({
-            'timestamp': datetime.now(),
-            'type': alert_type,
-            'severity': severity,
-            'message': message
-        })
+        self._record_alert(alert_type, severity, message)
         
         # Format message
         formatted_msg = f"""
@@ -415,11 +488,11 @@ class TradingMonitor:
             'performance': perf,
             'health': health,
             'uptime_hours': uptime,
-            'recent_alerts': list(self.alerts.alert_history)[-10:]
+            'recent_alerts': self.alerts.get_alert_history(limit=10)
         }
     
-    def save_logs(self, filepath: str = "./logs/monitor_state.json"):
-        """Save monitoring state"""
+    def save_summary(self, filepath: str = "./logs/monitor_state.json"):
+        """Save dashboard summary as JSON"""
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
         dashboard = self.get_dashboard()
@@ -427,7 +500,23 @@ class TradingMonitor:
         with open(filepath, 'w') as f:
             json.dump(dashboard, f, indent=2, default=str)
         
-        logger.info(f"Monitoring state saved to {filepath}")
+        logger.info(f"Monitoring summary saved to {filepath}")
+    
+    def save_curves(self, dirpath: str = "./logs"):
+        """Save equity curve and trade P&L as raw NumPy arrays"""
+        os.makedirs(dirpath, exist_ok=True)
+        
+        eq_time, eq_value = self.performance.get_equity_curve()
+        np.save(os.path.join(dirpath, 'equity_time.npy'), eq_time)
+        np.save(os.path.join(dirpath, 'equity.npy'), eq_value)
+        np.save(os.path.join(dirpath, 'trade_pnl.npy'), self.performance.get_trade_pnl())
+        
+        logger.info(f"Monitoring curves saved to {dirpath}")
+    
+    def save_logs(self, filepath: str = "./logs/monitor_state.json"):
+        """Save monitoring state (JSON summary plus curves next to it)"""
+        self.save_summary(filepath)
+        self.save_curves(os.path.dirname(filepath))
 
 
 if __name__ == "__main__":
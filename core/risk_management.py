@@ -13,11 +13,13 @@ Features:
 
 import numpy as np
 import pandas as pd
-from typing import Dict, Optional, Tuple
-from datetime import datetime, date
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, date, timedelta
 import logging
 import json
 import os
+import pickle
+import time
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -67,11 +69,12 @@ class RiskManager:
         self.min_balance = min_balance
         
         # Tracking
-        self.positions = {}  # {symbol: position_info}
+        self._reset_positions()
         self.daily_start_value = None
         self.peak_portfolio_value = None
         self.trades_today = 0
         self.current_date = None
+        self._day_end_ts = 0.0  # Epoch time (time.time()) at which current_date ends
         self.trading_enabled = True
         self.circuit_breaker_triggered = False
         
@@ -85,9 +88,69 @@ class RiskManager:
         logger.info(f"  Daily loss limit: {daily_loss_limit*100:.1f}%")
         logger.info(f"  Max drawdown: {max_drawdown*100:.1f}%")
     
-    def reset_daily_counters(self, portfolio_value: float):
-        """Reset daily counters at market open"""
-        today = date.today()
+    def _reset_positions(self, capacity: int = 16):
+        """
+        Clear open positions
+        
+        Positions are stored as parallel arrays (one slot per symbol) so that
+        trailing stops and stop-loss checks can run across all positions at once.
+        """
+        self._sym_idx = {}  # {symbol: slot}
+        self._symbols = []
+        self._entry_time = []
+        self._entry = np.empty(capacity, dtype=np.float64)
+        self._qty = np.empty(capacity, dtype=np.int64)
+        self._sl = np.empty(capacity, dtype=np.float64)
+        self._high = np.empty(capacity, dtype=np.float64)
+        self._n = 0
+    
+    def _grow(self, size: int):
+        """Ensure the position arrays can hold `size` slots"""
+        if size <= len(self._entry):
+            return
+        capacity = max(size, 2 * len(self._entry))
+        self._entry = np.resize(self._entry, capacity)
+        self._qty = np.resize(self._qty, capacity)
+        self._sl = np.resize(self._sl, capacity)
+        self._high = np.resize(self._high, capacity)
+    
+    @property
+    def positions(self) -> Dict:
+        """Open positions as {symbol: position_info}"""
+        return {
+            symbol: {
+                'entry_price': float(self._entry[i]),
+                'quantity': int(self._qty[i]),
+                'stop_loss_price': float(self._sl[i]),
+                'entry_time': self._entry_time[i],
+                'highest_price': float(self._high[i])
+            }
+            for i, symbol in enumerate(self._symbols)
+        }
+    
+    @property
+    def symbols(self) -> List[str]:
+        """Symbols of open positions in slot order (the order expected by update_all)"""
+        return list(self._symbols)
+    
+    def reset_daily_counters(self, portfolio_value: float, today: Optional[date] = None):
+        """
+        Reset daily counters at market open
+        
+        Args:
+            portfolio_value: Current portfolio value
+            today: Current trading date. Backtests should pass the bar's date;
+                   if omitted the wall-clock date is used (checked at most once per day).
+        """
+        if today is None:
+            # Fast path: still inside the day we last saw, skip the date lookup
+            # (wall-clock, so a suspended host still rolls over at midnight)
+            if time.time() < self._day_end_ts:
+                return
+            today = date.today()
+            self._day_end_ts = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+        else:
+            self._day_end_ts = 0.0
         
         if self.current_date != today:
             self.current_date = today
@@ -105,7 +168,8 @@ class RiskManager:
                 self.circuit_breaker_triggered = False
                 self.trading_enabled = True
             
-            logger.info(f"Daily counters reset. Start value: ₹{portfolio_value:,.2f}")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(f"Daily counters reset. Start value: ₹{portfolio_value:,.2f}")
     
     def check_daily_loss_limit(self, current_value: float) -> Tuple[bool, str]:
         """
@@ -187,26 +251,19 @@ class RiskManager:
         Returns:
             Number of shares to trade
         """
-        # Base position size from action
-        base_position_value = abs(action) * balance
-        
-        # Apply max position size limit
-        max_position_value = portfolio_value * self.max_position_size
-        position_value = min(base_position_value, max_position_value)
+        # Base position size from action, capped at the max position size
+        position_value = min(abs(action) * balance, portfolio_value * self.max_position_size)
         
         # Adjust for volatility if provided
         if volatility is not None and volatility > self.volatility_threshold:
             # Reduce position size in high volatility
             volatility_factor = self.volatility_threshold / volatility
             position_value *= volatility_factor
-            logger.info(f"High volatility ({volatility:.2%}) - reduced position by {(1-volatility_factor)*100:.1f}%")
+            logger.debug("High volatility (%.2f%%) - reduced position by %.1f%%",
+                         volatility * 100, (1 - volatility_factor) * 100)
         
-        # Convert to shares
-        shares = int(position_value / current_price)
-        
-        # Ensure we have enough balance
-        if shares * current_price > balance:
-            shares = int(balance / current_price)
+        # Convert to shares (never more than the available balance)
+        shares = int(min(position_value, balance) / current_price)
         
         return shares
     
@@ -221,31 +278,103 @@ class RiskManager:
         
         stop_loss_price = entry_price * (1 - self.stop_loss_pct)
         
-        self.positions[symbol] = {
-            'entry_price': entry_price,
-            'quantity': quantity,
-            'stop_loss_price': stop_loss_price,
-            'entry_time': timestamp,
-            'highest_price': entry_price
-        }
+        i = self._sym_idx.get(symbol)
+        if i is None:
+            i = self._n
+            self._grow(i + 1)
+            self._sym_idx[symbol] = i
+            self._symbols.append(symbol)
+            self._entry_time.append(timestamp)
+            self._n += 1
+        else:
+            self._entry_time[i] = timestamp
+        
+        self._entry[i] = entry_price
+        self._qty[i] = quantity
+        self._sl[i] = stop_loss_price
+        self._high[i] = entry_price
         
         self.trades_today += 1
         
-        logger.info(f"Position added: {symbol} - {quantity} @ ₹{entry_price:.2f}, SL: ₹{stop_loss_price:.2f}")
+        logger.info("Position added: %s - %d @ ₹%.2f, SL: ₹%.2f", symbol, quantity, entry_price, stop_loss_price)
+    
+    def add_positions_batch(self,
+                            symbols: List[str],
+                            entry_prices,
+                            quantities,
+                            timestamp: datetime = None):
+        """
+        Record several new positions at once (e.g. a portfolio rebalance)
+        
+        Stop-losses for the whole batch are computed with one array multiply.
+        Symbols that are already open are overwritten, as in add_position.
+        
+        Args:
+            symbols: Stock symbols
+            entry_prices: Entry prices aligned with `symbols`
+            quantities: Quantities aligned with `symbols`
+            timestamp: Entry time shared by the batch (default: now)
+        """
+        if timestamp is None:
+            timestamp = datetime.now()
+        
+        entry_prices = np.asarray(entry_prices, dtype=np.float64)
+        quantities = np.asarray(quantities, dtype=np.int64)
+        
+        self._grow(self._n + len(symbols))
+        slots = np.empty(len(symbols), dtype=np.intp)
+        for j, symbol in enumerate(symbols):
+            i = self._sym_idx.get(symbol)
+            if i is None:
+                i = self._n
+                self._sym_idx[symbol] = i
+                self._symbols.append(symbol)
+                self._entry_time.append(timestamp)
+                self._n += 1
+            else:
+                self._entry_time[i] = timestamp
+            slots[j] = i
+        
+        self._entry[slots] = entry_prices
+        self._qty[slots] = quantities
+        self._sl[slots] = entry_prices * (1 - self.stop_loss_pct)
+        self._high[slots] = entry_prices
+        
+        self.trades_today += len(symbols)
+        
+        logger.info("Positions added: %d symbols", len(symbols))
     
     def update_position(self, symbol: str, current_price: float):
         """Update position with trailing stop-loss"""
-        if symbol not in self.positions:
+        i = self._sym_idx.get(symbol)
+        if i is None:
             return
         
-        pos = self.positions[symbol]
-        
         # Update highest price for trailing stop
-        if current_price > pos['highest_price']:
-            pos['highest_price'] = current_price
+        if current_price > self._high[i]:
+            self._high[i] = current_price
             # Update trailing stop-loss
-            pos['stop_loss_price'] = current_price * (1 - self.stop_loss_pct)
-            logger.debug(f"Trailing SL updated for {symbol}: ₹{pos['stop_loss_price']:.2f}")
+            self._sl[i] = current_price * (1 - self.stop_loss_pct)
+            logger.debug("Trailing SL updated for %s: ₹%.2f", symbol, self._sl[i])
+    
+    def _price_array(self, prices) -> np.ndarray:
+        """Current prices aligned with `symbols` (dict inputs: missing symbols become NaN)"""
+        if isinstance(prices, dict):
+            return np.array([prices.get(symbol, np.nan) for symbol in self._symbols], dtype=np.float64)
+        return np.asarray(prices, dtype=np.float64)
+    
+    def update_all(self, prices):
+        """
+        Update trailing stop-losses for all open positions at once
+        
+        Args:
+            prices: {symbol: price} or an array aligned with `symbols`
+        """
+        n = self._n
+        prices = self._price_array(prices)
+        mask = prices > self._high[:n]
+        np.copyto(self._high[:n], prices, where=mask)
+        np.copyto(self._sl[:n], prices * (1 - self.stop_loss_pct), where=mask)
     
     def check_stop_loss(self, symbol: str, current_price: float) -> Tuple[bool, str]:
         """
@@ -254,54 +383,96 @@ class RiskManager:
         Returns:
             (should_exit, reason)
         """
-        if symbol not in self.positions:
+        i = self._sym_idx.get(symbol)
+        if i is None:
             return False, ""
         
-        pos = self.positions[symbol]
-        
-        if current_price <= pos['stop_loss_price']:
-            loss_pct = (pos['entry_price'] - current_price) / pos['entry_price']
+        if current_price <= self._sl[i]:
+            loss_pct = (self._entry[i] - current_price) / self._entry[i]
             reason = f"⚠️  STOP-LOSS triggered: {symbol} @ ₹{current_price:.2f} (Loss: {loss_pct*100:.2f}%)"
             logger.warning(reason)
             return True, reason
         
         return False, ""
     
+    def check_stop_loss_batch(self, prices) -> List[str]:
+        """
+        Check stop-losses for all open positions in one vectorized compare
+        
+        Args:
+            prices: {symbol: price} or an array aligned with `symbols`
+            
+        Returns:
+            Symbols whose stop-loss triggered
+        """
+        prices = self._price_array(prices)
+        triggered = np.flatnonzero(prices <= self._sl[:self._n])
+        
+        for i in triggered:
+            loss_pct = (self._entry[i] - prices[i]) / self._entry[i]
+            logger.warning("⚠️  STOP-LOSS triggered: %s @ ₹%.2f (Loss: %.2f%%)", self._symbols[i], prices[i], loss_pct * 100)
+        
+        return [self._symbols[i] for i in triggered]
+    
     def remove_position(self, symbol: str, exit_price: float, timestamp: datetime = None):
         """Remove position after exit"""
-        if symbol not in self.positions:
+        i = self._sym_idx.get(symbol)
+        if i is None:
             return
         
-        pos = self.positions[symbol]
-        pnl = (exit_price - pos['entry_price']) * pos['quantity']
-        pnl_pct = (exit_price - pos['entry_price']) / pos['entry_price']
+        entry_price = float(self._entry[i])
+        quantity = int(self._qty[i])
+        pnl = (exit_price - entry_price) * quantity
+        pnl_pct = (exit_price - entry_price) / entry_price
         
         # Record trade
         self.trade_history.append({
             'symbol': symbol,
-            'entry_price': pos['entry_price'],
+            'entry_price': entry_price,
             'exit_price': exit_price,
-            'quantity': pos['quantity'],
+            'quantity': quantity,
             'pnl': pnl,
             'pnl_pct': pnl_pct,
-            'entry_time': pos['entry_time'],
+            'entry_time': self._entry_time[i],
             'exit_time': timestamp or datetime.now(),
-            'stop_loss_hit': exit_price <= pos['stop_loss_price']
+            'stop_loss_hit': exit_price <= self._sl[i]
         })
         
-        del self.positions[symbol]
-        
-        logger.info(f"Position closed: {symbol} - P&L: ₹{pnl:,.2f} ({pnl_pct*100:.2f}%)")
+        # Move the last slot into the freed one to keep the arrays dense
+        last = self._n - 1
+        if i != last:
+            moved = self._symbols[last]
+            for arr in (self._entry, self._qty, self._sl, self._high):
+                arr[i] = arr[last]
+            self._symbols[i] = moved
+            self._entry_time[i] = self._entry_time[last]
+            self._sym_idx[moved] = i
+        
+        self._symbols.pop()
+        self._entry_time.pop()
+        del self._sym_idx[symbol]
+        self._n = last
+        
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"Position closed: {symbol} - P&L: ₹{pnl:,.2f} ({pnl_pct*100:.2f}%)")
     
-    def can_trade(self, portfolio_value: float, balance: float) -> Tuple[bool, str]:
+    def can_trade(self,
+                  portfolio_value: float,
+                  balance: float,
+                  today: Optional[date] = None) -> Tuple[bool, str]:
         """
         Check all risk conditions before allowing trade
         
+        Args:
+            portfolio_value: Current portfolio value
+            balance: Available cash
+            today: Current trading date (see reset_daily_counters)
+        
         Returns:
             (can_trade, reason)
         """
         # Reset daily counters if new day
-        self.reset_daily_counters(portfolio_value)
+        self.reset_daily_counters(portfolio_value, today)
         
         # Check if circuit breaker triggered
         if self.circuit_breaker_triggered:
@@ -339,7 +510,7 @@ class RiskManager:
             'circuit_breaker': self.circuit_breaker_triggered,
             'trades_today': self.trades_today,
             'max_trades': self.max_trades_per_day,
-            'open_positions': len(self.positions),
+            'open_positions': self._n,
             'portfolio_value': portfolio_value
         }
         
@@ -356,44 +527,118 @@ class RiskManager:
         
         return metrics
     
-    def save_state(self, filepath: str = "./logs/risk_state.json"):
-        """Save risk manager state"""
+    def rolling_max_drawdown(self, values, window: int = 252) -> float:
+        """
+        Maximum drawdown measured from the rolling peak of the last `window` values
+        
+        Args:
+            values: Portfolio value series (e.g. daily equity curve)
+            window: Lookback for the peak (252 = one trading year)
+            
+        Returns:
+            Maximum drawdown as a fraction (0.0 for an empty series)
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return 0.0
+        
+        peaks = pd.Series(values).rolling(window, min_periods=1).max().to_numpy()
+        return float(((peaks - values) / peaks).max())
+    
+    def save_state(self, filepath: str = "./logs/risk_state.pkl"):
+        """Save risk manager state (pickle keeps floats and datetimes exact)"""
         os.makedirs(os.path.dirname(filepath), exist_ok=True)
         
+        n = self._n
         state = {
-            'positions': self.positions,
+            'symbols': list(self._symbols),
+            'entry_time': list(self._entry_time),
+            'entry_price': self._entry[:n].copy(),
+            'quantity': self._qty[:n].copy(),
+            'stop_loss_price': self._sl[:n].copy(),
+            'highest_price': self._high[:n].copy(),
             'daily_start_value': self.daily_start_value,
             'peak_portfolio_value': self.peak_portfolio_value,
             'trades_today': self.trades_today,
-            'current_date': str(self.current_date),
+            'current_date': self.current_date,
             'trading_enabled': self.trading_enabled,
             'circuit_breaker_triggered': self.circuit_breaker_triggered,
             'trade_history': self.trade_history[-100:]  # Last 100 trades
         }
         
-        with open(filepath, 'w') as f:
-            json.dump(state, f, indent=2, default=str)
+        with open(filepath, 'wb') as f:
+            pickle.dump(state, f, protocol=5)
         
         logger.info(f"Risk state saved to {filepath}")
     
-    def load_state(self, filepath: str = "./logs/risk_state.json"):
-        """Load risk manager state"""
-        try:
-            with open(filepath, 'r') as f:
-                state = json.load(f)
-            
-            self.positions = state.get('positions', {})
-            self.daily_start_value = state.get('daily_start_value')
-            self.peak_portfolio_value = state.get('peak_portfolio_value')
-            self.trades_today = state.get('trades_today', 0)
-            self.trading_enabled = state.get('trading_enabled', True)
-            self.circuit_breaker_triggered = state.get('circuit_breaker_triggered', False)
-            self.trade_history = state.get('trade_history', [])
-            
-            logger.info(f"Risk state loaded from {filepath}")
-            
-        except FileNotFoundError:
+    def load_state(self, filepath: str = "./logs/risk_state.pkl"):
+        """
+        Load risk manager state
+        
+        If the pickle doesn't exist yet, the JSON state written by earlier
+        versions (same name, .json) is read instead; the next save_state
+        writes it back as pickle. Missing fields take their defaults.
+        """
+        legacy_path = os.path.splitext(filepath)[0] + '.json'
+        if os.path.exists(filepath):
+            with open(filepath, 'rb') as f:
+                state = pickle.load(f)
+        elif os.path.exists(legacy_path):
+            with open(legacy_path, 'r') as f:
+                state = self._from_legacy_state(json.load(f))
+            filepath = legacy_path
+        else:
             logger.warning(f"No saved state found at {filepath}")
+            return
+        
+        symbols = list(state.get('symbols', []))
+        n = len(symbols)
+        columns = {key: state.get(key, []) for key in
+                   ('entry_time', 'entry_price', 'quantity', 'stop_loss_price', 'highest_price')}
+        if any(len(values) != n for values in columns.values()):
+            raise ValueError(f"Position fields in {filepath} don't match its {n} symbols")
+        
+        self._reset_positions(max(16, n))
+        self._symbols = symbols
+        self._sym_idx = {symbol: i for i, symbol in enumerate(symbols)}
+        self._entry_time = list(columns['entry_time'])
+        self._entry[:n] = columns['entry_price']
+        self._qty[:n] = columns['quantity']
+        self._sl[:n] = columns['stop_loss_price']
+        self._high[:n] = columns['highest_price']
+        self._n = n
+        
+        self.daily_start_value = state.get('daily_start_value')
+        self.peak_portfolio_value = state.get('peak_portfolio_value')
+        self.trades_today = state.get('trades_today', 0)
+        self.current_date = state.get('current_date')
+        self._day_end_ts = 0.0  # Re-check the date on the next call
+        self.trading_enabled = state.get('trading_enabled', True)
+        self.circuit_breaker_triggered = state.get('circuit_breaker_triggered', False)
+        self.trade_history = state.get('trade_history', [])
+        
+        logger.info(f"Risk state loaded from {filepath}")
+    
+    @staticmethod
+    def _from_legacy_state(state: dict) -> dict:
+        """Convert the old JSON state ({symbol: position dict}, stringified dates) to the pickle layout"""
+        def parse(value, parser):
+            try:
+                return parser(value)
+            except (TypeError, ValueError):
+                return None
+        
+        positions = state.get('positions', {})
+        converted = {key: value for key, value in state.items() if key != 'positions'}
+        converted['symbols'] = list(positions)
+        converted['entry_time'] = [parse(p.get('entry_time'), datetime.fromisoformat) or p.get('entry_time')
+                                   for p in positions.values()]
+        converted['entry_price'] = [p.get('entry_price') for p in positions.values()]
+        converted['quantity'] = [p.get('quantity') for p in positions.values()]
+        converted['stop_loss_price'] = [p.get('stop_loss_price') for p in positions.values()]
+        converted['highest_price'] = [p.get('highest_price', p.get('entry_price')) for p in positions.values()]
+        converted['current_date'] = parse(state.get('current_date'), date.fromisoformat)
+        return converted
     
     def emergency_stop(self, reason: str = "Manual intervention"):
         """Emergency stop - disable all trading"""
@@ -0,0 +1,41 @@
+"""
+Indicator kernels against the `ta` library they replace
+"""
+
+import numpy as np
+import pandas as pd
+import ta
+
+from core.indicators import sma, compute_indicators
+
+
+def _ohlcv(n=600, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.002, n)),
+        'High': close * (1 + np.abs(rng.normal(0, 0.005, n))),
+        'Low': close * (1 - np.abs(rng.normal(0, 0.005, n))),
+        'Close': close,
+        'Volume': rng.integers(1_000, 10_000, n).astype(float),
+    }, index=pd.date_range('2019-01-01', periods=n, freq='D'))
+
+
+def test_sma_matches_ta_across_nan_gap():
+    x = pd.Series(np.random.default_rng(1).normal(100, 5, 300))
+    x.iloc[[50, 51, 120]] = np.nan
+
+    for window in (5, 20, 50):
+        expected = ta.trend.sma_indicator(x, window=window).to_numpy()
+        np.testing.assert_allclose(sma(x.to_numpy(), window), expected, rtol=1e-10, equal_nan=True)
+
+
+def test_compute_indicators_recovers_after_nan_volume():
+    df = _ohlcv()
+    df.iloc[300, df.columns.get_loc('Volume')] = np.nan
+
+    out = compute_indicators(df)
+
+    # Only the warm-up and the 20 bars whose volume window holds the NaN are dropped
+    assert out.index[-1] == df.index[-1]
+    assert len(out) == len(df) - 199 - 20
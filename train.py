@@ -1,21 +1,64 @@
 import os
+
+# One BLAS/OpenMP thread per process, so parallel env workers don't oversubscribe
+# the cores (must be set before numpy/torch are imported; inherited by workers)
+os.environ.setdefault("OMP_NUM_THREADS", "1")
+os.environ.setdefault("MKL_NUM_THREADS", "1")
+
 import numpy as np
 import pandas as pd
+import torch
 from stable_baselines3 import PPO, A2C, SAC
-from stable_baselines3.common.vec_env import DummyVecEnv
+from stable_baselines3.common.vec_env import DummyVecEnv, SubprocVecEnv
 from stable_baselines3.common.callbacks import EvalCallback, CheckpointCallback
 from stable_baselines3.common.monitor import Monitor
 from core.env import StockTradingEnv
 from process import prepare_data, split_data
 import argparse
 
+def make_env(df: pd.DataFrame, initial_balance: float, features: np.ndarray = None,
+             prices: np.ndarray = None):
+    """
+    Build an environment factory for vectorized envs
+    
+    Args:
+        df: Prepared market data
+        initial_balance: Initial portfolio balance
+        features: Precomputed StockTradingEnv.build_features(df), shared by every env
+        prices: Precomputed StockTradingEnv.build_prices(df), shared by every env
+        
+    Returns:
+        Callable that creates a Monitor-wrapped StockTradingEnv
+    """
+    if features is None:
+        features = StockTradingEnv.build_features(df)
+    if prices is None:
+        prices = StockTradingEnv.build_prices(df)
+    
+    def _init():
+        return Monitor(StockTradingEnv(df, initial_balance, features=features, prices=prices))
+    return _init
+
+def _worker_env(env_fn):
+    """
+    Wrap an env factory for a SubprocVecEnv worker process
+    
+    Pins torch to one thread there (env workers never need intra-op
+    parallelism); in-process envs leave the trainer's thread count alone.
+    """
+    def _init():
+        torch.set_num_threads(1)
+        return env_fn()
+    return _init
+
 def train_agent(symbol: str = "RELIANCE",
                 start_date: str = "2018-01-01",
                 end_date: str = "2024-12-31",
                 initial_balance: float = 100000.0,
                 total_timesteps: int = 500000,
                 algorithm: str = "PPO",
-                indian_stock: bool = True):
+                indian_stock: bool = True,
+                num_envs: int = 1):
     """
     Train the RL agent on stock data
     
@@ -27,6 +70,7 @@ def train_agent(symbol: str = "RELIANCE",
         total_timesteps: Total training timesteps
         algorithm: RL algorithm to use (PPO, A2C, SAC)
         indian_stock: Whether trading Indian stocks
+        num_envs: Number of parallel training environments (subprocesses if > 1)
     """
     
     print(f"\n{'='*70}")
@@ -37,6 +81,7 @@ def train_agent(symbol: str = "RELIANCE",
     print(f"Algorithm: {algorithm}")
     print(f"Initial Balance: ₹{initial_balance:,.2f}")
     print(f"Total Timesteps: {total_timesteps:,}")
+    print(f"Parallel Envs: {num_envs}")
     print(f"{'='*70}\n")
     
     # Prepare data
@@ -51,14 +96,19 @@ def train_agent(symbol: str = "RELIANCE",
     
     # Create environments
     print("Creating training environment...")
-    train_env = StockTradingEnv(train_data, initial_balance)
-    train_env = Monitor(train_env)
-    train_env = DummyVecEnv([lambda: train_env])
+    env_fn = make_env(train_data, initial_balance)  # One shared feature matrix
+    if num_envs > 1:
+        train_env = SubprocVecEnv([_worker_env(env_fn)] * num_envs)
+    else:
+        train_env = DummyVecEnv([env_fn])
     
     print("Creating evaluation environment...")
-    eval_env = StockTradingEnv(test_data, initial_balance)
-    eval_env = Monitor(eval_env)
-    eval_env = DummyVecEnv([lambda: eval_env])
+    eval_env_fn = make_env(test_data, initial_balance)
+    eval_env = DummyVecEnv([eval_env_fn])
+    
+    # Give the trainer the cores not taken by env workers
+    worker_cores = num_envs if num_envs > 1 else 0
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) - worker_cores))
     
     # Create directories
     os.makedirs("./models", exist_ok=True)
@@ -67,20 +117,27 @@ def train_agent(symbol: str = "RELIANCE",
     # Initialize model based on algorithm
     print(f"\nInitializing {algorithm} model...")
     
+    # Use the GPU when available, with minibatches large enough to keep it busy
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    if device == "cuda":
+        torch.set_float32_matmul_precision('high')  # TF32 matmuls on Ampere+
+    print(f"Device: {device}")
+    
     if algorithm == "PPO":
         model = PPO(
             "MlpPolicy", 
             train_env, 
             verbose=1,
             learning_rate=3e-4,
-            n_steps=2048,
-            batch_size=64,
+            n_steps=max(2048 // num_envs, 64),  # Same samples per update for any num_envs
+            batch_size=512 if device == "cuda" else 64,
             n_epochs=10,
             gamma=0.99,
             gae_lambda=0.95,
             clip_range=0.2,
             ent_coef=0.01,
-            tensorboard_log="./logs/tensorboard/"
+            tensorboard_log="./logs/tensorboard/",
+            device=device
         )
     elif algorithm == "A2C":
         model = A2C(
@@ -92,7 +149,8 @@ def train_agent(symbol: str = "RELIANCE",
             gamma=0.99,
             gae_lambda=1.0,
             ent_coef=0.01,
-            tensorboard_log="./logs/tensorboard/"
+            tensorboard_log="./logs/tensorboard/",
+            device=device
         )
     elif algorithm == "SAC":
         model = SAC(
@@ -105,7 +163,8 @@ def train_agent(symbol: str = "RELIANCE",
             gamma=0.99,
             tau=0.005,
             ent_coef='auto',
-            tensorboard_log="./logs/tensorboard/"
+            tensorboard_log="./logs/tensorboard/",
+            device=device
         )
     else:
         raise ValueError(f"Unknown algorithm: {algorithm}")
@@ -115,14 +174,14 @@ def train_agent(symbol: str = "RELIANCE",
         eval_env,
         best_model_save_path="./models/best/",
         log_path="./logs/eval/",
-        eval_freq=10000,
+        eval_freq=max(10000 // num_envs, 1),  # Counted in vec-env steps
         deterministic=True,
         render=False,
         verbose=1
     )
     
     checkpoint_callback = CheckpointCallback(
-        save_freq=50000,
+        save_freq=max(50000 // num_envs, 1),
         save_path="./models/checkpoints/",
         name_prefix=f"{algorithm}_{symbol}"
     )
@@ -143,44 +202,80 @@ def train_agent(symbol: str = "RELIANCE",
     model.save(final_model_path)
     print(f"\nFinal model saved to: {final_model_path}")
     
-    return model, train_env, eval_env
+    return model, train_env, eval_env_fn
 
-def evaluate_agent(model, eval_env, num_episodes: int = 10):
+def compile_policy(model):
+    """
+    Compile the policy's inference path with torch.compile
+    
+    model.predict() goes through policy._predict, so that is what gets compiled
+    (CUDA graphs on GPU via reduce-overhead). The first predict call per batch
+    shape/mode pays the compile cost. Save the model before compiling.
+    
+    Args:
+        model: Trained SB3 model
+        
+    Returns:
+        The same model, with a compiled policy._predict
+    """
+    model.policy._predict = torch.compile(model.policy._predict, mode="reduce-overhead")
+    return model
+
+def _run_episodes(model, env_fn, num_episodes: int, deterministic: bool):
+    """
+    Run episodes side by side in one DummyVecEnv (one batched predict per step)
+    
+    Returns:
+        (total reward per episode, final info dict per episode)
+    """
+    vec_env = DummyVecEnv([env_fn] * num_episodes)
+    obs = vec_env.reset()
+    total_rewards = np.zeros(num_episodes)
+    final_infos = [{} for _ in range(num_episodes)]
+    active = np.ones(num_episodes, dtype=bool)
+    
+    while active.any():
+        actions, _ = model.predict(obs, deterministic=deterministic)
+        obs, rewards, dones, infos = vec_env.step(actions)
+        np.add(total_rewards, rewards, out=total_rewards, where=active)
+        
+        # Finished envs auto-reset; keep the info from their terminal step only
+        for i in np.flatnonzero(dones & active):
+            final_infos[i] = infos[i]
+        active &= ~dones
+    
+    vec_env.close()
+    return total_rewards.tolist(), final_infos
+
+def evaluate_agent(model, env_fn, num_episodes: int = 10):
     """
     Evaluate the trained agent
     
     Args:
         model: Trained model
-        eval_env: Evaluation environment
+        env_fn: Factory returning a Monitor-wrapped evaluation environment (see make_env)
         num_episodes: Number of episodes to evaluate
     """
     print(f"\n{'='*70}")
     print(f"Evaluating Agent - {num_episodes} Episodes")
     print(f"{'='*70}\n")
     
+    # Use deterministic=False for first 5 episodes to see if agent has learned diversity
+    # Then use deterministic=True for the rest; each group runs as one batch
+    num_stochastic = min(5, num_episodes)
     episode_rewards = []
+    episode_infos = []
+    for count, deterministic in ((num_stochastic, False), (num_episodes - num_stochastic, True)):
+        if count > 0:
+            rewards, infos = _run_episodes(model, env_fn, count, deterministic)
+            episode_rewards.extend(rewards)
+            episode_infos.extend(infos)
+    
     episode_returns = []
     episode_sharpes = []
     episode_trades = []
     
-    for episode in range(num_episodes):
-        obs = eval_env.reset()  # DummyVecEnv returns just obs, not (obs, info)
-        done = False
-        total_reward = 0
-        
-        # Use deterministic=False for first 5 episodes to see if agent has learned diversity
-        # Then use deterministic=True for last 5 episodes
-        use_deterministic = episode >= 5
-        
-        while not done:
-            action, _ = model.predict(obs, deterministic=use_deterministic)
-            obs, reward, done, info = eval_env.step(action)  # DummyVecEnv returns 4 values
-            total_reward += reward[0]
-            done = done[0]  # Extract done flag from array
-        
-        # Extract episode info
-        episode_info = info[0]
-        episode_rewards.append(total_reward)
+    for episode, (total_reward, episode_info) in enumerate(zip(episode_rewards, episode_infos)):
         episode_returns.append(episode_info.get('total_return', 0))
         episode_sharpes.append(episode_info.get('sharpe_ratio', 0))
         episode_trades.append(episode_info.get('total_trades', 0))
@@ -225,22 +320,29 @@ def main():
                        help='Trading Indian stocks')
     parser.add_argument('--eval-episodes', type=int, default=10,
                        help='Number of evaluation episodes')
+    parser.add_argument('--num-envs', type=int, default=1,
+                       help='Number of parallel training environments')
+    parser.add_argument('--compile', action='store_true',
+                       help='torch.compile the policy for evaluation')
     
     args = parser.parse_args()
     
     # Train agent
-    model, train_env, eval_env = train_agent(
+    model, train_env, eval_env_fn = train_agent(
         symbol=args.symbol,
         start_date=args.start,
         end_date=args.end,
         initial_balance=args.balance,
         total_timesteps=args.timesteps,
         algorithm=args.algorithm,
-        indian_stock=args.indian
+        indian_stock=args.indian,
+        num_envs=args.num_envs
     )
     
     # Evaluate agent
-    evaluate_agent(model, eval_env, num_episodes=args.eval_episodes)
+    if args.compile:
+        compile_policy(model)
+    evaluate_agent(model, eval_env_fn, num_episodes=args.eval_episodes)
 
 if __name__ == "__main__":
     main()
@@ -6,15 +6,19 @@ Free delayed data (15-20 minute delay)
 from .data_yahoo import (
     fetch_stock_data_yahoo,
     fetch_realtime_quote_yahoo,
+    fetch_many,
     add_technical_indicators,
     prepare_data_yahoo,
+    prepare_data_batch,
     get_latest_market_data_yahoo
 )
 
 __all__ = [
     'fetch_stock_data_yahoo',
     'fetch_realtime_quote_yahoo',
+    'fetch_many',
     'add_technical_indicators',
     'prepare_data_yahoo',
+    'prepare_data_batch',
     'get_latest_market_data_yahoo'
 ]
@@ -0,0 +1,94 @@
+"""
+Incremental on-disk cache of per-symbol bar history
+
+Each entry holds the bars for one parameter set (MD5-keyed). A lookup within
+the TTL is served from memory/disk; after it, only the bars since the last
+cached one are fetched and merged in.
+"""
+
+import hashlib
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+
+
+class FileCache:
+    """
+    Parquet-backed bar cache, extended with only the new bars on refresh
+    """
+    
+    def __init__(self, cache_dir: str = '.cache/yahoo/live', ttl: float = 60.0):
+        """
+        Args:
+            cache_dir: Directory for the parquet files
+            ttl: Seconds a cached frame is served without checking for new bars
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self._frames: Dict[str, Tuple[float, pd.DataFrame]] = {}
+    
+    def _key(self, symbol: str, interval: str, params: dict) -> str:
+        """MD5 of the symbol, interval and any other request parameters"""
+        raw = '|'.join([symbol, interval] + [f"{k}={params[k]}" for k in sorted(params)])
+        return hashlib.md5(raw.encode()).hexdigest()
+    
+    def _load(self, key: str) -> Optional[Tuple[float, pd.DataFrame]]:
+        """Cached (refresh time, frame) from memory, falling back to disk"""
+        if key in self._frames:
+            return self._frames[key]
+        path = os.path.join(self.cache_dir, f"{key}.parquet")
+        if not os.path.exists(path):
+            return None
+        # The index is stored as a regular column (see _store)
+        df = pd.read_parquet(path, engine='pyarrow')
+        df = df.set_index(df.columns[0])
+        entry = (os.path.getmtime(path), df)
+        self._frames[key] = entry
+        return entry
+    
+    def _store(self, key: str, df: pd.DataFrame):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        df.reset_index().to_parquet(os.path.join(self.cache_dir, f"{key}.parquet"), engine='pyarrow', index=False)
+        self._frames[key] = (time.time(), df)
+    
+    def get_or_extend(self, symbol: str, fetch_fn: Callable[[Optional[pd.Timestamp]], pd.DataFrame],
+                      interval: str = '1d', window: Optional[pd.Timedelta] = None,
+                      **params) -> pd.DataFrame:
+        """
+        Cached bars for symbol, topped up with fetch_fn when older than the TTL
+        
+        Args:
+            symbol: Stock symbol
+            fetch_fn: Called with the last cached timestamp (None on a miss) and
+                      returns the bars from that timestamp on, inclusive, so a
+                      still-forming last bar gets replaced
+            interval: Bar interval (part of the key)
+            window: Keep only the bars within this span of the newest one
+            **params: Other request parameters that change the data (part of the key)
+        
+        Returns:
+            DataFrame of bars, oldest first
+        """
+        key = self._key(symbol, interval, params)
+        entry = self._load(key)
+        if entry is not None and time.time() - entry[0] < self.ttl:
+            return entry[1]
+        
+        cached = entry[1] if entry is not None else None
+        new = fetch_fn(cached.index[-1] if cached is not None and len(cached) else None)
+        
+        if cached is None:
+            df = new
+        elif new is None or new.empty:
+            df = cached
+        else:
+            # New bars win where they overlap the cached ones
+            df = pd.concat([cached[cached.index < new.index[0]], new])
+        
+        if window is not None and len(df):
+            df = df[df.index > df.index[-1] - window]
+        
+        self._store(key, df)
+        return df
@@ -0,0 +1,27 @@
+"""
+Ahead-of-time build of the live trading kernels
+Compiles yahoo_finance/kernels.py into the `live_kernels` extension module so
+a (re)started live trader skips numba's JIT warm-up
+
+Usage:
+    python yahoo_finance/_kernels_aot.py
+"""
+
+import os
+import sys
+
+from numba.pycc import CC
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yahoo_finance.kernels import _build_obs_nb, _apply_actions_nb
+
+cc = CC('live_kernels')
+cc.output_dir = os.path.dirname(os.path.abspath(__file__))
+cc.verbose = True
+
+cc.export('build_obs', 'void(f4[:], f8, f8, f8, f8, f4[:])')(_build_obs_nb.py_func)
+cc.export('apply_actions', 'void(f8[:], b1[:], f8[:], f8[:], i8[:], f8, i8[:], i8[:])')(_apply_actions_nb.py_func)
+
+
+if __name__ == "__main__":
+    cc.compile()
@@ -6,15 +6,66 @@ Best for: Learning, backtesting, research
 
 import pandas as pd
 import yfinance as yf
-import ta
 import numpy as np
-from typing import Optional
+from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 import logging
+import hashlib
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from core.indicators import compute_indicators, zscore_inplace, zscore_apply_inplace
+from yahoo_finance._cache import FileCache
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Local cache of downloaded OHLCV history (one parquet file per request)
+CACHE_DIR = '.cache/yahoo'
+
+# Cache of fully prepared (indicators + normalization) frames
+PREPARED_CACHE_DIR = '.cache/prepared'
+
+# Bump whenever compute_indicators or _prepare_features output changes (invalidates caches)
+INDICATOR_VERSION = 3
+
+# Incrementally extended bar history for live trading
+_LIVE_CACHE = FileCache(os.path.join(CACHE_DIR, 'live'))
+
+# Last prepared live frame per request, reused until its bars change
+_LIVE_PREPARED: Dict[tuple, tuple] = {}
+
+# Column layout of Ticker.history(), so batch downloads produce the same features
+HISTORY_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume', 'Dividends', 'Stock Splits']
+
+
+# One keep-alive HTTP session shared by every Ticker/download call (created lazily)
+_SESSION = None
+
+
+def _get_session():
+    """Shared HTTP session (curl_cffi, as yfinance expects, falling back to requests)"""
+    global _SESSION
+    if _SESSION is None:
+        try:
+            from curl_cffi import requests as curl_requests
+            _SESSION = curl_requests.Session(impersonate="chrome")
+        except ImportError:
+            import requests
+            _SESSION = requests.Session()
+    return _SESSION
+
+
+def _is_cacheable(end_date: str) -> bool:
+    """Whether a date range has fully closed (its data can no longer change)"""
+    return end_date < datetime.now().strftime("%Y-%m-%d")
+
+
+def _cache_path(symbol: str, start_date: str, end_date: str, indian_stock: bool) -> str:
+    """Cache file path for a request, without extension"""
+    key = hashlib.md5(f"{symbol}|{start_date}|{end_date}|{indian_stock}".encode()).hexdigest()
+    return os.path.join(CACHE_DIR, key)
+
 
 def fetch_stock_data_yahoo(symbol: str, start_date: str, end_date: str, indian_stock: bool = True) -> pd.DataFrame:
     """
@@ -29,32 +80,47 @@ def fetch_stock_data_yahoo(symbol: str, start_date: str, end_date: str, indian_s
     Returns:
         DataFrame with OHLCV data
     """
+    # Only ranges that have fully closed are cached, so live data is never stale
+    cacheable = _is_cacheable(end_date)
+    cache_path = _cache_path(symbol, start_date, end_date, indian_stock) + '.parquet'
+    if cacheable and os.path.exists(cache_path):
+        # The index is stored as a regular column (see below)
+        df = pd.read_parquet(cache_path, engine='pyarrow')
+        df = df.set_index(df.columns[0])
+        logger.info(f"Loaded {len(df)} rows for {symbol} from cache")
+        return df
+    
     try:
         if indian_stock and not (symbol.endswith('.NS') or symbol.endswith('.BO')):
             # Try NSE first
             symbol_nse = f"{symbol}.NS"
-            stock = yf.Ticker(symbol_nse)
+            stock = yf.Ticker(symbol_nse, session=_get_session())
             df = stock.history(start=start_date, end=end_date)
             
             if df.empty:
                 # Try BSE if NSE fails
                 logger.info(f"NSE data empty, trying BSE for {symbol}")
                 symbol_bse = f"{symbol}.BO"
-                stock = yf.Ticker(symbol_bse)
+                stock = yf.Ticker(symbol_bse, session=_get_session())
                 df = stock.history(start=start_date, end=end_date)
                 
             if df.empty:
                 logger.warning(f"No data with suffix, trying {symbol} without suffix")
-                stock = yf.Ticker(symbol)
+                stock = yf.Ticker(symbol, session=_get_session())
                 df = stock.history(start=start_date, end=end_date)
         else:
-            stock = yf.Ticker(symbol)
+            stock = yf.Ticker(symbol, session=_get_session())
             df = stock.history(start=start_date, end=end_date)
         
         if df.empty:
             raise ValueError(f"No data retrieved for {symbol}")
         
         logger.info(f"Fetched {len(df)} rows for {symbol} from Yahoo Finance")
+        
+        if cacheable:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            df.reset_index().to_parquet(cache_path, engine='pyarrow', index=False)
+        
         return df
         
     except Exception as e:
@@ -78,7 +144,7 @@ def fetch_realtime_quote_yahoo(symbol: str, indian_stock: bool = True) -> Option
         if indian_stock and not (symbol.endswith('.NS') or symbol.endswith('.BO')):
             symbol = f"{symbol}.NS"
         
-        stock = yf.Ticker(symbol)
+        stock = yf.Ticker(symbol, session=_get_session())
         
         # Try intraday first
         hist = stock.history(period="1d", interval="1m")
@@ -108,6 +174,45 @@ def fetch_realtime_quote_yahoo(symbol: str, indian_stock: bool = True) -> Option
         return None
 
 
+def fetch_many(symbols: List[str], start_date: str, end_date: str, indian_stock: bool = True) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch historical data for several symbols concurrently
+    
+    Issues one yf.download call, which requests all tickers in parallel threads.
+    
+    Args:
+        symbols: Stock symbols
+        start_date: Start date (YYYY-MM-DD)
+        end_date: End date (YYYY-MM-DD)
+        indian_stock: Add .NS suffix for Indian stocks (no BSE fallback here)
+        
+    Returns:
+        {symbol: OHLCV DataFrame} in the Ticker.history() column layout;
+        symbols with no data are skipped
+    """
+    tickers = [
+        f"{symbol}.NS" if indian_stock and not (symbol.endswith('.NS') or symbol.endswith('.BO')) else symbol
+        for symbol in symbols
+    ]
+    raw = yf.download(tickers, start=start_date, end=end_date, group_by='ticker',
+                      actions=True, auto_adjust=True, threads=True, progress=False,
+                      session=_get_session())
+    
+    frames = {}
+    for symbol, ticker in zip(symbols, tickers):
+        if raw is None or ticker not in raw.columns.get_level_values(0):
+            logger.warning(f"No data retrieved for {symbol}")
+            continue
+        df = raw[ticker].reindex(columns=HISTORY_COLUMNS).dropna(subset=['Close'])
+        if df.empty:
+            logger.warning(f"No data retrieved for {symbol}")
+            continue
+        frames[symbol] = df.fillna({'Dividends': 0.0, 'Stock Splits': 0.0})
+    
+    logger.info(f"Fetched {len(frames)}/{len(symbols)} symbols from Yahoo Finance")
+    return frames
+
+
 def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     """
     Add comprehensive technical indicators
@@ -118,59 +223,61 @@ def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with technical indicators added
     """
-    # Moving Averages
-    df['SMA_5'] = ta.trend.sma_indicator(df['Close'], window=5)
-    df['SMA_10'] = ta.trend.sma_indicator(df['Close'], window=10)
-    df['SMA_20'] = ta.trend.sma_indicator(df['Close'], window=20)
-    df['SMA_50'] = ta.trend.sma_indicator(df['Close'], window=50)
-    df['SMA_200'] = ta.trend.sma_indicator(df['Close'], window=200)
-    
-    # EMA
-    df['EMA_12'] = ta.trend.ema_indicator(df['Close'], window=12)
-    df['EMA_26'] = ta.trend.ema_indicator(df['Close'], window=26)
+    df = compute_indicators(df)
     
-    # RSI
-    df['RSI'] = ta.momentum.rsi(df['Close'], window=14)
-    
-    # MACD
-    macd = ta.trend.MACD(df['Close'])
-    df['MACD'] = macd.macd()
-    df['MACD_Signal'] = macd.macd_signal()
-    df['MACD_Diff'] = df['MACD'] - df['MACD_Signal']
+    logger.info(f"Added {len(df.columns)} technical indicators")
+    return df
+
+
+def _prepare_features(df: pd.DataFrame, norm_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Add indicators and normalize a raw OHLCV frame (shared by single and batch preparation)
     
-    # Bollinger Bands
-    bollinger = ta.volatility.BollingerBands(df['Close'])
-    df['BB_Upper'] = bollinger.bollinger_hband()
-    df['BB_Lower'] = bollinger.bollinger_lband()
-    df['BB_Middle'] = bollinger.bollinger_mavg()
-    df['BB_Width'] = (df['BB_Upper'] - df['BB_Lower']) / df['BB_Middle']
+    Args:
+        df: Raw OHLCV DataFrame
+        norm_path: Optional .npz file for the normalization schema; reused if
+                   present, written after the first computation otherwise
+    """
+    # Keep original close for reference
+    df['Original_Close'] = df['Close'].copy()
     
-    # ATR (Average True Range)
-    df['ATR'] = ta.volatility.average_true_range(df['High'], df['Low'], df['Close'], window=14)
+    # Add technical indicators
+    df = add_technical_indicators(df)
     
-    # Volume indicators
-    df['Volume_SMA'] = ta.trend.sma_indicator(df['Volume'], window=20)
-    df['Volume_Ratio'] = df['Volume'] / df['Volume_SMA']
+    # Normalize (except Original_Close)
+    cols_to_normalize = df.select_dtypes(include=[np.number]).columns
+    cols_to_normalize = cols_to_normalize.drop('Original_Close', errors='ignore')
     
-    # Stochastic Oscillator
-    stoch = ta.momentum.StochasticOscillator(df['High'], df['Low'], df['Close'])
-    df['Stoch_K'] = stoch.stoch()
-    df['Stoch_D'] = stoch.stoch_signal()
+    # Reuse the stored schema (columns + mean/std) for this window if there is
+    # one; it must cover exactly these columns, or a new one would pass through
+    # unnormalized, so any mismatch recomputes (and rewrites) the statistics
+    schema = None
+    if norm_path and os.path.exists(norm_path):
+        with np.load(norm_path) as stored:
+            schema = (list(stored['cols']), stored['mean'], stored['std'])
+        if set(schema[0]) != set(cols_to_normalize):
+            logger.warning(f"Stored normalization columns in {norm_path} don't match the data, recomputing")
+            schema = None
     
-    # Price Rate of Change
-    df['ROC'] = ta.momentum.roc(df['Close'], window=10)
+    if schema is not None:
+        cols_to_normalize, mean, std = schema
     
-    # ADX (Average Directional Index)
-    df['ADX'] = ta.trend.adx(df['High'], df['Low'], df['Close'], window=14)
+    # Features are float32 (what the policy consumes); the kernels accumulate
+    # statistics in float64. Column-major, so each column is contiguous.
+    values = np.asfortranarray(df[cols_to_normalize].to_numpy(dtype=np.float32))
     
-    # Returns
-    df['Returns'] = df['Close'].pct_change()
-    df['Log_Returns'] = np.log(df['Close'] / df['Close'].shift(1))
+    if schema is not None:
+        zscore_apply_inplace(values, mean, std)
+    else:
+        # Z-score and NaN-fill in one pass
+        mean, std = zscore_inplace(values)
+        
+        if norm_path:
+            os.makedirs(os.path.dirname(norm_path), exist_ok=True)
+            np.savez(norm_path, cols=np.array(cols_to_normalize, dtype=str), mean=mean, std=std)
     
-    # Drop NaN values
-    df = df.dropna()
+    df[cols_to_normalize] = values
     
-    logger.info(f"Added {len(df.columns)} technical indicators")
     return df
 
 
@@ -187,29 +294,68 @@ def prepare_data_yahoo(symbol: str, start_date: str, end_date: str, indian_stock
     Returns:
         Prepared DataFrame with indicators
     """
+    # Closed windows are cached fully prepared, keyed by the indicator version
+    cacheable = _is_cacheable(end_date)
+    key = hashlib.sha1(f"{symbol}|{start_date}|{end_date}|{indian_stock}|v{INDICATOR_VERSION}".encode()).hexdigest()
+    prepared_path = os.path.join(PREPARED_CACHE_DIR, f"{key}.parquet")
+    if cacheable and os.path.exists(prepared_path):
+        df = pd.read_parquet(prepared_path)
+        logger.info(f"Loaded prepared data for {symbol} from cache: {len(df)} rows, {len(df.columns)} features")
+        return df
+    
     # Fetch data
     df = fetch_stock_data_yahoo(symbol, start_date, end_date, indian_stock)
     
-    # Keep original close for reference
-    df['Original_Close'] = df['Close'].copy()
+    # Normalization stats are fixed by the window, so closed windows reuse them
+    norm_path = None
+    if cacheable:
+        norm_path = _cache_path(symbol, start_date, end_date, indian_stock) + f'.v{INDICATOR_VERSION}.norm.npz'
     
-    # Add technical indicators
-    df = add_technical_indicators(df)
-    
-    # Normalize (except Original_Close)
-    cols_to_normalize = df.select_dtypes(include=[np.number]).columns
-    cols_to_normalize = cols_to_normalize.drop('Original_Close', errors='ignore')
+    df = _prepare_features(df, norm_path)
     
-    df[cols_to_normalize] = (df[cols_to_normalize] - df[cols_to_normalize].mean()) / (df[cols_to_normalize].std() + 1e-8)
+    if cacheable:
+        os.makedirs(PREPARED_CACHE_DIR, exist_ok=True)
+        df.to_parquet(prepared_path, compression='zstd')
     
     logger.info(f"Data prepared: {len(df)} rows, {len(df.columns)} features")
     return df
 
 
+def prepare_data_batch(symbols: List[str], start_date: str, end_date: str,
+                       indian_stock: bool = True, n_jobs: int = -1) -> Dict[str, pd.DataFrame]:
+    """
+    Fetch and prepare several symbols at once (Yahoo Finance)
+    
+    All symbols are downloaded concurrently (see fetch_many), then
+    indicators are computed in parallel worker processes.
+    
+    Args:
+        symbols: Stock symbols
+        start_date: Start date
+        end_date: End date
+        indian_stock: Add .NS suffix for Indian stocks (no BSE fallback in batch mode)
+        n_jobs: joblib worker count (-1 = all cores)
+        
+    Returns:
+        {symbol: prepared DataFrame}; symbols with no data are skipped
+    """
+    from joblib import Parallel, delayed
+    
+    frames = fetch_many(symbols, start_date, end_date, indian_stock)
+    
+    prepared = Parallel(n_jobs=n_jobs)(delayed(_prepare_features)(df) for df in frames.values())
+    return dict(zip(frames.keys(), prepared))
+
+
 def get_latest_market_data_yahoo(symbol: str, lookback_days: int = 100, indian_stock: bool = True) -> pd.DataFrame:
     """
     Get latest market data for live trading (Yahoo Finance)
     
+    Raw bars come from an incremental cache: repeated calls only download the
+    bars since the last cached one (and nothing at all within the cache TTL).
+    While the bars are unchanged the same prepared frame is returned, so
+    treat it as read-only.
+    
     Args:
         symbol: Stock symbol
         lookback_days: Days of historical data
@@ -220,14 +366,26 @@ def get_latest_market_data_yahoo(symbol: str, lookback_days: int = 100, indian_s
     """
     end_date = datetime.now()
     start_date = end_date - timedelta(days=lookback_days)
+    end_str = end_date.strftime("%Y-%m-%d")
+    
+    def fetch(since):
+        start = since.strftime("%Y-%m-%d") if since is not None else start_date.strftime("%Y-%m-%d")
+        return fetch_stock_data_yahoo(symbol, start, end_str, indian_stock)
     
-    df = prepare_data_yahoo(
-        symbol,
-        start_date.strftime("%Y-%m-%d"),
-        end_date.strftime("%Y-%m-%d"),
-        indian_stock
-    )
+    # The cached window slides forward as new bars are appended
+    bars = _LIVE_CACHE.get_or_extend(symbol, fetch, window=pd.Timedelta(days=lookback_days),
+                                     lookback_days=lookback_days, indian_stock=indian_stock)
     
+    # Daily bars only change when a new one lands, so most calls see the same
+    # window: reuse its prepared frame instead of recomputing every indicator
+    key = (symbol, lookback_days, indian_stock)
+    prev = _LIVE_PREPARED.get(key)
+    if prev is not None and prev[0].equals(bars.index) and prev[1].equals(bars.iloc[-1]):
+        return prev[2]
+    
+    df = _prepare_features(bars.copy())
+    _LIVE_PREPARED[key] = (bars.index, bars.iloc[-1], df)
+    logger.info(f"Data prepared: {len(df)} rows, {len(df.columns)} features")
     return df
 
 
@@ -0,0 +1,111 @@
+"""
+Compiled Live Trading Kernels
+Numba versions of the live trader's per-cycle numeric work
+
+Features:
+- Observation build into a preallocated buffer (same layout as core/env.py)
+- Trade rules of LiveTrader.execute_action applied to arrays of symbols
+
+Run `python yahoo_finance/_kernels_aot.py` once to build the ahead-of-time
+compiled `live_kernels` extension; build_obs() and apply_actions() use it
+when present and fall back to JIT compilation otherwise.
+"""
+
+import numpy as np
+from numba import njit
+
+try:
+    from . import live_kernels as _aot
+except ImportError:
+    _aot = None
+
+
+@njit(cache=True)
+def _build_obs_nb(market_row, balance, shares, price, initial_balance, out):
+    """Write market features + normalized portfolio state into out (same layout as StockTradingEnv)"""
+    n = market_row.size
+    for i in range(n):
+        out[i] = market_row[i]
+    shares_value = shares * price
+    portfolio_value = balance + shares_value
+    out[n] = balance / initial_balance
+    out[n + 1] = shares_value / initial_balance
+    out[n + 2] = portfolio_value / initial_balance
+    out[n + 3] = shares_value / portfolio_value if portfolio_value > 0 else 0.0
+
+
+@njit(cache=True)
+def _apply_actions_nb(actions, mask, prices, balances, shares, transaction_cost_rate, bought, sold):
+    """
+    Apply one action per symbol to the balances/shares arrays in place
+    (the trade rules of both live traders); bought/sold receive the share counts
+    
+    Branch-free: the buy/sell/hold choice is folded into masks and selects, so
+    the loop body is straight-line code the compiler can vectorize.
+    """
+    for i in range(actions.size):
+        action = actions[i]
+        active = mask[i]
+        price = prices[i] if active else 1.0  # Masked-out slots may hold NaN
+        balance = balances[i]
+        held = shares[i]
+        
+        # Buy up to 95% of the balance, only if the whole cost is covered
+        n_buy = np.int64(balance * min(max(action, 0.0), 0.95) / price)
+        cost = n_buy * price
+        total_cost = cost + cost * transaction_cost_rate
+        do_buy = active & (action > 0.1) & (n_buy > 0) & (total_cost <= balance)
+        
+        # Sell a fraction of the holding
+        n_sell = np.int64(held * min(abs(action), 1.0))
+        revenue = n_sell * price
+        do_sell = active & (action < -0.1) & (n_sell > 0)
+        
+        n_buy = n_buy if do_buy else 0
+        n_sell = n_sell if do_sell else 0
+        balances[i] = (balance - (total_cost if do_buy else 0.0)
+                       + (revenue - revenue * transaction_cost_rate if do_sell else 0.0))
+        shares[i] = held + n_buy - n_sell
+        bought[i] = n_buy
+        sold[i] = n_sell
+
+
+def build_obs(market_row: np.ndarray, balance: float, shares: float, price: float,
+              initial_balance: float, out: np.ndarray):
+    """
+    Build one observation into out
+
+    Args:
+        market_row: float32 market features
+        balance: Cash balance
+        shares: Shares held
+        price: Current price
+        initial_balance: Starting balance (normalization scale)
+        out: float32 buffer of market_row.size + 4
+    """
+    if _aot is not None:
+        _aot.build_obs(market_row, balance, shares, price, initial_balance, out)
+    else:
+        _build_obs_nb(market_row, balance, shares, price, initial_balance, out)
+
+
+def apply_actions(actions: np.ndarray, mask: np.ndarray, prices: np.ndarray,
+                  balances: np.ndarray, shares: np.ndarray, transaction_cost_rate: float,
+                  bought: np.ndarray, sold: np.ndarray):
+    """
+    Execute one action per symbol, updating balances (f8) and shares (i8) in place
+
+    Args:
+        actions: f8 action per symbol (-1 to 1)
+        mask: Symbols to act on (the others hold)
+        prices: f8 current price per symbol
+        balances: f8 cash per symbol
+        shares: i8 shares held per symbol
+        transaction_cost_rate: Fee rate per trade
+        bought: i8 output, shares bought per symbol
+        sold: i8 output, shares sold per symbol
+    """
+    if _aot is not None:
+        _aot.apply_actions(actions, mask, prices, balances, shares, transaction_cost_rate, bought, sold)
+    else:
+        _apply_actions_nb(actions, mask, prices, balances, shares, transaction_cost_rate, bought, sold)
@@ -5,56 +5,515 @@ Supports live data fetching and paper trading for Indian stocks
 
 import numpy as np
 import pandas as pd
+import torch
 from stable_baselines3 import PPO
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from core.env import StockTradingEnv
-from process import get_latest_market_data, fetch_realtime_data
+from yahoo_finance.kernels import build_obs, apply_actions
+from yahoo_finance.data_yahoo import get_latest_market_data_yahoo, fetch_realtime_quote_yahoo
+import asyncio
 import time
 from datetime import datetime
 import json
+import importlib
+import yfinance as yf
+from gymnasium import spaces
+from typing import List, Optional
+import atexit
+import logging
+import copy
+import queue
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 
-class LiveTrader:
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Background thread that formats and writes this module's log records
+_log_listener = None
+
+
+def _start_log_listener():
+    """Route this module's status output through a queue to a writer thread"""
+    global _log_listener
+    if _log_listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    _log_listener = QueueListener(log_queue, handler)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    _log_listener.start()
+    atexit.register(_stop_log_listener)
+
+
+def _stop_log_listener():
+    """Flush queued log records and stop the writer thread"""
+    global _log_listener
+    if _log_listener is not None:
+        _log_listener.stop()
+        _log_listener = None
+
+
+def _write_ndjson(fp, kind: str, entry: dict):
+    """Encode one log entry and append it as a line (runs on the log writer thread)"""
+    if orjson is not None:
+        fp.write(orjson.dumps({'type': kind, **entry}, option=orjson.OPT_SERIALIZE_NUMPY).decode() + '\n')
+    else:
+        fp.write(json.dumps({'type': kind, **entry}, separators=(',', ':')) + '\n')
+
+
+def _report_log_error(future):
+    """Done-callback for _write_ndjson: surface encode/IO errors instead of dropping them"""
+    exc = future.exception()
+    if exc is not None:
+        logger.error("Failed to write trading log entry: %r", exc)
+
+
+def _dump_json(path: str, obj: dict):
+    """Write obj as indented JSON, with orjson when it is installed"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(path, 'w') as f:
+            json.dump(obj, f, indent=2)
+
+
+async def _sleep_until_next(deadline: float, update_interval: float) -> float:
+    """
+    Sleep until one interval past the previous deadline and return the new one
+    
+    Deadlines advance by exactly update_interval on the monotonic clock, so
+    cycle time and sleep overshoot don't accumulate into drift. A cycle that
+    overran is logged and the schedule restarts from now instead of bursting
+    to catch up.
+    """
+    deadline += update_interval
+    sleep_for = deadline - time.monotonic()
+    if sleep_for > 0:
+        await asyncio.sleep(sleep_for)
+        return deadline
+    logger.warning("tick overran by %.3fs", -sleep_for)
+    return time.monotonic()
+
+
+def _qualname(obj) -> str:
+    return f"{obj.__module__}:{obj.__qualname__}"
+
+
+def _resolve(name: str):
+    """Inverse of _qualname: import 'module:Qual.Name'"""
+    module, _, attr = name.partition(':')
+    obj = importlib.import_module(module)
+    for part in attr.split('.'):
+        obj = getattr(obj, part)
+    return obj
+
+
+def _box_to_meta(space: spaces.Box) -> dict:
+    return {'shape': list(space.shape), 'dtype': str(space.dtype),
+            'low': space.low.tolist(), 'high': space.high.tolist()}
+
+
+def _box_from_meta(meta: dict) -> spaces.Box:
+    return spaces.Box(low=np.array(meta['low'], dtype=meta['dtype']),
+                      high=np.array(meta['high'], dtype=meta['dtype']),
+                      shape=tuple(meta['shape']), dtype=meta['dtype'])
+
+
+def export_policy_weights(model_path: str, out_path: Optional[str] = None) -> str:
+    """
+    Convert a saved SB3 model to a .safetensors file of its policy weights
+    
+    The policy's constructor arguments go into the file's metadata, so
+    LiveTrader can rebuild the network from it without PPO.load.
+    
+    Args:
+        model_path: Path to the trained model (.zip)
+        out_path: Output path (default: model path with a .safetensors suffix)
+    
+    Returns:
+        Path of the written file
+    """
+    from safetensors.torch import save_file
+    
+    policy = PPO.load(model_path, device='cpu').policy
+    params = policy._get_constructor_parameters()
+    # Training-only arguments; the optimizer is never stepped live
+    for key in ('lr_schedule', 'optimizer_class', 'optimizer_kwargs'):
+        params.pop(key, None)
+    config = {
+        **params,
+        'policy_class': _qualname(type(policy)),
+        'observation_space': _box_to_meta(params['observation_space']),
+        'action_space': _box_to_meta(params['action_space']),
+        'activation_fn': _qualname(params['activation_fn']),
+        'features_extractor_class': _qualname(params['features_extractor_class']),
+    }
+    
+    out_path = out_path or os.path.splitext(model_path)[0] + '.safetensors'
+    state = {k: v.contiguous() for k, v in policy.state_dict().items()}
+    save_file(state, out_path, metadata={'policy_config': json.dumps(config)})
+    return out_path
+
+
+def _load_policy(model_path: str):
+    """
+    Policy network of a trained model, in eval mode
+    
+    A .safetensors file from export_policy_weights is loaded straight into a
+    freshly built policy (CPU, no unzip or unpickling); anything else goes
+    through PPO.load.
+    """
+    if not model_path.endswith('.safetensors'):
+        return PPO.load(model_path).policy.eval()
+    
+    from safetensors import safe_open
+    
+    with safe_open(model_path, framework='pt', device='cpu') as f:
+        config = json.loads(f.metadata()['policy_config'])
+        state = {k: f.get_tensor(k) for k in f.keys()}
+    policy_class = _resolve(config.pop('policy_class'))
+    config['observation_space'] = _box_from_meta(config['observation_space'])
+    config['action_space'] = _box_from_meta(config['action_space'])
+    config['activation_fn'] = _resolve(config['activation_fn'])
+    config['features_extractor_class'] = _resolve(config['features_extractor_class'])
+    config['ortho_init'] = False  # Overwritten by the stored weights anyway
+    
+    policy = policy_class(lr_schedule=lambda _: 0.0, **config)
+    policy.load_state_dict(state)
+    return policy.eval()
+
+
+class _TracedActor(torch.nn.Module):
+    """
+    Deterministic actor path of an SB3 actor-critic policy (Box actions)
+    
+    Traced with TorchScript and warmed up once, then called directly instead
+    of model.predict(obs, deterministic=True): same actions, without SB3's
+    per-call wrapper or the eager module dispatch. The clip to the action
+    bounds is part of the graph, so a tick is one call from obs to action.
+    """
+    
+    def __init__(self, policy, action_space):
+        super().__init__()
+        self.policy = policy
+        self.register_buffer('low', torch.as_tensor(action_space.low, device=policy.device))
+        self.register_buffer('high', torch.as_tensor(action_space.high, device=policy.device))
+    
+    def forward(self, obs):
+        features = self.policy.extract_features(obs, self.policy.pi_features_extractor)
+        actions = self.policy.action_net(self.policy.mlp_extractor.forward_actor(features))
+        return torch.clamp(actions, self.low, self.high)
+    
+    @classmethod
+    def trace(cls, policy, warmup: int = 3, quantize: bool = False):
+        """
+        Trace policy's actor and return a callable obs -> clipped actions
+        
+        Accepts a single observation or a (batch, obs_dim) stack, like predict.
+        With quantize, the Linear layers run as dynamic int8 on the CPU.
+        """
+        policy = policy.eval()
+        actor = cls(policy, policy.action_space)
+        device = policy.device
+        with warnings.catch_warnings():
+            # Recent torch flags TorchScript and eager quantization as
+            # deprecated; both still need no compile step at start-up
+            warnings.simplefilter('ignore', FutureWarning)
+            warnings.simplefilter('ignore', DeprecationWarning)
+            warnings.filterwarnings('ignore', message='torch.quantize_per_tensor')
+            if quantize:
+                device = torch.device('cpu')
+                actor = torch.ao.quantization.quantize_dynamic(
+                    copy.deepcopy(actor).cpu(), {torch.nn.Linear}, dtype=torch.qint8
+                )
+            example = torch.zeros((1, *policy.observation_space.shape), dtype=torch.float32, device=device)
+            with torch.inference_mode():
+                traced = torch.jit.trace(actor, example, check_trace=False)
+                # Inline the weights and bounds as constants and fuse for this
+                # one fixed shape; nothing about the network changes after start-up
+                traced = torch.jit.optimize_for_inference(traced)
+                for _ in range(warmup):
+                    traced(example)
+        if quantize:
+            # Sanity check against the float32 actor
+            probe = torch.randn((64, *policy.observation_space.shape), generator=torch.Generator().manual_seed(0))
+            with torch.inference_mode():
+                reference = cls(policy, policy.action_space)(probe.to(policy.device)).cpu()
+                drift = (traced(probe) - reference).abs().max().item()
+            if drift > 1e-2:
+                logger.warning("int8 policy drifts from float32 by up to %.4f", drift)
+        
+        def act(obs: np.ndarray) -> np.ndarray:
+            batch = obs if obs.ndim == 2 else obs[None]
+            with torch.inference_mode():
+                actions = traced(torch.as_tensor(batch, device=device)).cpu().numpy()
+            return actions if obs.ndim == 2 else actions[0]
+        return act
+
+
+# Calendar days of bars behind each live decision: the prepared frame drops the
+# 200-bar SMA warm-up, and at least 50 rows must remain after it
+_LOOKBACK_DAYS = 400
+
+
+def _latest_prepared(symbol: str, indian_stock: bool) -> Optional[pd.DataFrame]:
+    """Prepared live frame for symbol, or None if it can't be fetched or is too short"""
+    try:
+        df = get_latest_market_data_yahoo(symbol, lookback_days=_LOOKBACK_DAYS, indian_stock=indian_stock)
+    except Exception as e:
+        logger.error("Error fetching market data for %s: %s", symbol, e)
+        return None
+    if df.empty or len(df) < 50:
+        logger.warning("Warning: Insufficient data for %s", symbol)
+        return None
+    return df
+
+
+def _latest_price(symbol: str, indian_stock: bool, bar_close: float) -> float:
+    """Latest (delayed) quote for symbol, falling back to the last bar's close"""
+    quote = fetch_realtime_quote_yahoo(symbol, indian_stock)
+    return float(quote['price']) if quote is not None else bar_close
+
+
+class _RowReader:
+    """
+    Reads (float32 market features, price) from the last row of a prepared frame
+    
+    Column positions are resolved once per column layout, so each read is one
+    row conversion and a fancy index instead of dropping a column from the frame.
+    get_latest_market_data_yahoo hands back the same frame object while the
+    bars are unchanged, and re-reading that frame returns the previous row.
+    """
+    
+    def __init__(self):
+        self._layout = (None, None, None)  # (columns, feature positions, price position)
+        self._last = (None, None)          # (frame, row read from it)
+    
+    def __call__(self, df: pd.DataFrame):
+        if df is self._last[0]:
+            return self._last[1]
+        columns, feat_idx, price_idx = self._layout
+        if df.columns is not columns and not df.columns.equals(columns):
+            columns = df.columns
+            feat_idx = np.flatnonzero(columns != 'Original_Close')
+            price_idx = columns.get_loc('Original_Close' if 'Original_Close' in columns else 'Close')
+            self._layout = (columns, feat_idx, price_idx)
+        row = df.iloc[-1:].to_numpy(dtype=np.float64)[0]
+        result = (row[feat_idx].astype(np.float32), float(row[price_idx]))
+        self._last = (df, result)
+        return result
+
+
+class _LiveTraderBase:
+    """
+    Model, paper-trade execution and logging shared by the live traders
+    
+    Every trade goes through the apply_actions kernel, for one symbol or
+    many, so LiveTrader and PortfolioLiveTrader follow the same rules.
+    """
+    
+    def __init__(self,
+                 model_path: str,
+                 symbols: List[str],
+                 log_name: str,
+                 initial_balance: float,
+                 indian_stock: bool,
+                 paper_trading: bool,
+                 quantize: bool):
+        self.model_path = model_path
+        self.symbols = list(symbols)
+        self.initial_balance = initial_balance
+        self.indian_stock = indian_stock
+        self.paper_trading = paper_trading
+        self.transaction_cost_rate = 0.001  # 0.1%
+        
+        _start_log_listener()
+        
+        # Load trained model
+        print(f"Loading model from {model_path}...")
+        self.policy = _load_policy(model_path)
+        self._act = _TracedActor.trace(self.policy, quantize=quantize)
+        
+        self.portfolio_history = []
+        self.trade_history = []
+        self._read_rows = {s: _RowReader() for s in self.symbols}  # One per fetch thread
+        
+        # Create logs directory
+        os.makedirs("./logs/live_trading", exist_ok=True)
+        self.log_file = f"./logs/live_trading/{log_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        
+        # Every trade/portfolio entry is appended here as one JSON line as it
+        # happens; the consolidated log_file is only written on shutdown
+        self._log_fp = open(os.path.splitext(self.log_file)[0] + '.ndjson', 'a', buffering=1)
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ndjson')  # Keeps lines in order
+    
+    def _read_market(self, symbol: str):
+        """(float32 market row, last bar close) for symbol, or None without enough data"""
+        df = _latest_prepared(symbol, self.indian_stock)
+        if df is None:
+            return None
+        return self._read_rows[symbol](df)
+    
+    def _trade(self, actions: np.ndarray, mask: np.ndarray, prices: np.ndarray,
+               balances: np.ndarray, shares: np.ndarray, now: Optional[datetime] = None) -> List[dict]:
+        """
+        Execute one action per symbol and log the trades
+        
+        Args:
+            actions: f8 action per symbol (-1 to 1)
+            mask: Symbols to act on (the others hold)
+            prices: f8 current price per symbol
+            balances: f8 cash per symbol, updated in place
+            shares: i8 shares held per symbol, updated in place
+            now: Tick time, shared with update_portfolio_log (defaults to the current time)
+        
+        Returns:
+            Trade record of each symbol acted on
+        """
+        transaction_cost_rate = self.transaction_cost_rate
+        balances_before = balances.copy()
+        shares_before = shares.copy()
+        
+        # One compiled pass over all symbols; balances/shares are updated in place
+        shares_to_buy = np.empty_like(shares)
+        shares_to_sell = np.empty_like(shares)
+        apply_actions(actions, mask, prices, balances, shares, transaction_cost_rate,
+                      shares_to_buy, shares_to_sell)
+        
+        # Trade amounts for the logs
+        cost = shares_to_buy * prices
+        buy_fee = cost * transaction_cost_rate
+        total_cost = cost + buy_fee
+        revenue = shares_to_sell * prices
+        sell_fee = revenue * transaction_cost_rate
+        net_revenue = revenue - sell_fee
+        
+        timestamp = now or datetime.now()
+        ts_iso = timestamp.isoformat()
+        ts_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
+        log_trades = logger.isEnabledFor(logging.INFO)
+        records = []
+        for i in np.flatnonzero(mask):
+            action = float(actions[i])
+            price = float(prices[i])
+            trade_info = {
+                'timestamp': ts_iso,
+                'symbol': self.symbols[i],
+                'action_value': action,
+                'price': price,
+                'balance_before': float(balances_before[i]),
+                'shares_before': int(shares_before[i])
+            }
+            
+            if shares_to_buy[i] > 0:
+                trade_info.update({'action': 'BUY', 'shares': int(shares_to_buy[i]), 'cost': float(cost[i]),
+                                   'fee': float(buy_fee[i]), 'total_cost': float(total_cost[i])})
+                if log_trades:
+                    logger.info(f"[{ts_str}] {self.symbols[i]} BUY: {shares_to_buy[i]} shares @ ₹{price:.2f}\n"
+                                f"  Cost: ₹{total_cost[i]:,.2f} (Fee: ₹{buy_fee[i]:.2f})")
+            elif shares_to_sell[i] > 0:
+                trade_info.update({'action': 'SELL', 'shares': int(shares_to_sell[i]), 'revenue': float(revenue[i]),
+                                   'fee': float(sell_fee[i]), 'net_revenue': float(net_revenue[i])})
+                if log_trades:
+                    logger.info(f"[{ts_str}] {self.symbols[i]} SELL: {shares_to_sell[i]} shares @ ₹{price:.2f}\n"
+                                f"  Revenue: ₹{net_revenue[i]:,.2f} (Fee: ₹{sell_fee[i]:.2f})")
+            else:
+                trade_info['action'] = 'HOLD'
+                if action > 0.1:
+                    affordable = int(balances_before[i] * min(action, 0.95) / price)
+                    trade_info['reason'] = 'Insufficient balance' if affordable > 0 else 'Insufficient balance for even 1 share'
+                elif action < -0.1 and shares_before[i] == 0:
+                    trade_info['reason'] = 'No shares to sell'
+            
+            # Post-trade state
+            trade_info.update({
+                'balance_after': float(balances[i]),
+                'shares_after': int(shares[i]),
+                'portfolio_value': float(balances[i] + shares[i] * price)
+            })
+            
+            self.trade_history.append(trade_info)
+            self._append_log('trade', trade_info)
+            records.append(trade_info)
+        return records
+    
+    def _append_log(self, kind: str, entry: dict):
+        """Queue one entry for the NDJSON log; encoding and the write happen off the trading thread"""
+        self._io_pool.submit(_write_ndjson, self._log_fp, kind, entry).add_done_callback(_report_log_error)
+    
+    def _log_header(self) -> dict:
+        """Identifying fields at the top of the consolidated log"""
+        return {'symbols': self.symbols}
+    
+    def save_logs(self):
+        """Save the consolidated trading logs to file (on shutdown)"""
+        logs = {
+            **self._log_header(),
+            'initial_balance': self.initial_balance,
+            'paper_trading': self.paper_trading,
+            'portfolio_history': self.portfolio_history,
+            'trade_history': self.trade_history
+        }
+        
+        _dump_json(self.log_file, logs)
+        
+        print(f"Logs saved to {self.log_file}")
+    
+    def _run(self, loop):
+        """Run a trading loop coroutine until Ctrl+C, then flush and save the logs"""
+        try:
+            asyncio.run(loop)
+        except KeyboardInterrupt:
+            self._io_pool.shutdown(wait=True)  # Drain pending NDJSON lines (and report any failed write)
+            _stop_log_listener()  # Flush queued status output first
+            print("\n\nStopping live trading...")
+            self._log_fp.close()
+            self.save_logs()
+            print("Final logs saved. Goodbye!")
+
+
+class LiveTrader(_LiveTraderBase):
     """
     Live trading system with the trained RL agent
     """
     
-    def __init__(self, 
+    def __init__(self,
                  model_path: str,
                  symbol: str,
                  initial_balance: float = 100000.0,
                  indian_stock: bool = True,
-                 paper_trading: bool = True):
+                 paper_trading: bool = True,
+                 quantize: bool = False):
         """
         Initialize live trader
         
         Args:
-            model_path: Path to trained model
+            model_path: Path to trained model (.zip, or .safetensors from export_policy_weights)
             symbol: Stock symbol to trade
             initial_balance: Starting balance for paper trading
             indian_stock: Whether trading Indian stocks
             paper_trading: If True, simulate trades without real execution
+            quantize: Run the policy's Linear layers as dynamic int8 (CPU)
         """
-        self.model_path = model_path
+        super().__init__(model_path, [symbol], symbol, initial_balance, indian_stock, paper_trading, quantize)
         self.symbol = symbol
-        self.initial_balance = initial_balance
-        self.indian_stock = indian_stock
-        self.paper_trading = paper_trading
-        
-        # Load trained model
-        print(f"Loading model from {model_path}...")
-        self.model = PPO.load(model_path)
         
         # Initialize portfolio
         self.balance = initial_balance
         self.shares_held = 0
-        self.portfolio_history = []
-        self.trade_history = []
-        
-        # Create logs directory
-        os.makedirs("./logs/live_trading", exist_ok=True)
-        self.log_file = f"./logs/live_trading/{symbol}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        self._obs_buf = None  # Sized once the market feature count is known
         
         print(f"Live Trader initialized for {symbol}")
         print(f"Paper Trading: {paper_trading}")
@@ -65,139 +524,67 @@ class LiveTrader:
         Get current market state for the agent
         Returns observation that matches the training environment
         """
-        # Fetch latest market data
-        df = get_latest_market_data(self.symbol, lookback_days=200, indian_stock=self.indian_stock)
-        
-        if df.empty or len(df) < 50:
-            print("Warning: Insufficient data for decision making")
+        if not self.refresh_market_data():
             return None, None
+        price = _latest_price(self.symbol, self.indian_stock, self._last_close)
+        return self.build_state(price), price
+    
+    def refresh_market_data(self) -> bool:
+        """
+        Fetch the latest prepared bars and cache the newest market feature row
         
-        # Get the latest observation (last row)
-        market_obs = df.iloc[-1].drop('Original_Close', errors='ignore').values
-        
-        # Get current price
-        current_price = df.iloc[-1]['Original_Close'] if 'Original_Close' in df.columns else df.iloc[-1]['Close']
-        
-        # Calculate portfolio state
-        portfolio_value = self.balance + (self.shares_held * current_price)
-        position_ratio = (self.shares_held * current_price) / portfolio_value if portfolio_value > 0 else 0
-        
-        # Normalize portfolio features (consistent with training)
-        balance_normalized = self.balance / self.initial_balance
-        shares_value_normalized = (self.shares_held * current_price) / self.initial_balance
-        portfolio_normalized = portfolio_value / self.initial_balance
-        
-        portfolio_obs = np.array([
-            balance_normalized,
-            shares_value_normalized,
-            portfolio_normalized,
-            position_ratio
-        ])
+        Returns:
+            False if there is not enough data to make a decision
+        """
+        # Latest observation and current price (last row; the cached one while the bars are unchanged)
+        row = self._read_market(self.symbol)
+        if row is None:
+            return False
         
-        # Combine observations
-        obs = np.concatenate([market_obs, portfolio_obs])
+        self._market_obs, self._last_close = row
+        if self._obs_buf is None or self._obs_buf.size != self._market_obs.size + 4:
+            self._obs_buf = np.empty(self._market_obs.size + 4, dtype=np.float32)
+        return True
+    
+    def build_state(self, current_price: float) -> np.ndarray:
+        """
+        Observation for the cached market row at the given price
         
-        return obs.astype(np.float32), current_price
+        Returns the preallocated buffer, overwritten by the next call
+        """
+        build_obs(self._market_obs, float(self.balance), float(self.shares_held),
+                   float(current_price), float(self.initial_balance), self._obs_buf)
+        return self._obs_buf
     
-    def execute_action(self, action: float, current_price: float):
+    async def get_current_state_async(self):
+        """get_current_state on a worker thread, so the fetch doesn't block the event loop"""
+        return await asyncio.to_thread(self.get_current_state)
+    
+    def execute_action(self, action: float, current_price: float, now: Optional[datetime] = None):
         """
         Execute trading action
         
         Args:
             action: Action from model (-1 to 1)
             current_price: Current stock price
+            now: Tick time, shared with update_portfolio_log (defaults to the current time)
         """
-        transaction_cost_rate = 0.001  # 0.1%
-        timestamp = datetime.now()
-        
-        portfolio_value = self.balance + (self.shares_held * current_price)
-        
-        trade_info = {
-            'timestamp': timestamp.isoformat(),
-            'action_value': float(action),
-            'price': current_price,
-            'balance_before': self.balance,
-            'shares_before': self.shares_held
-        }
-        
-        if action > 0.1:  # Buy signal
-            # Calculate how much to buy
-            buy_amount = self.balance * min(action, 0.95)  # Max 95% of balance
-            shares_to_buy = int(buy_amount / current_price)
-            
-            if shares_to_buy > 0:
-                cost = shares_to_buy * current_price
-                transaction_fee = cost * transaction_cost_rate
-                total_cost = cost + transaction_fee
-                
-                if total_cost <= self.balance:
-                    self.shares_held += shares_to_buy
-                    self.balance -= total_cost
-                    
-                    trade_info.update({
-                        'action': 'BUY',
-                        'shares': shares_to_buy,
-                        'cost': cost,
-                        'fee': transaction_fee,
-                        'total_cost': total_cost
-                    })
-                    
-                    print(f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] BUY: {shares_to_buy} shares @ ₹{current_price:.2f}")
-                    print(f"  Cost: ₹{total_cost:,.2f} (Fee: ₹{transaction_fee:.2f})")
-                else:
-                    trade_info['action'] = 'HOLD'
-                    trade_info['reason'] = 'Insufficient balance'
-            else:
-                trade_info['action'] = 'HOLD'
-                trade_info['reason'] = 'Insufficient balance for even 1 share'
-        
-        elif action < -0.1:  # Sell signal
-            if self.shares_held > 0:
-                # Calculate how many shares to sell
-                sell_ratio = min(abs(action), 1.0)
-                shares_to_sell = int(self.shares_held * sell_ratio)
-                
-                if shares_to_sell > 0:
-                    revenue = shares_to_sell * current_price
-                    transaction_fee = revenue * transaction_cost_rate
-                    net_revenue = revenue - transaction_fee
-                    
-                    self.balance += net_revenue
-                    self.shares_held -= shares_to_sell
-                    
-                    trade_info.update({
-                        'action': 'SELL',
-                        'shares': shares_to_sell,
-                        'revenue': revenue,
-                        'fee': transaction_fee,
-                        'net_revenue': net_revenue
-                    })
-                    
-                    print(f"[{timestamp.strftime('%Y-%m-%d %H:%M:%S')}] SELL: {shares_to_sell} shares @ ₹{current_price:.2f}")
-                    print(f"  Revenue: ₹{net_revenue:,.2f} (Fee: ₹{transaction_fee:.2f})")
-            else:
-                trade_info['action'] = 'HOLD'
-                trade_info['reason'] = 'No shares to sell'
-        else:
-            trade_info['action'] = 'HOLD'
-        
-        # Update trade info with post-trade state
-        trade_info.update({
-            'balance_after': self.balance,
-            'shares_after': self.shares_held,
-            'portfolio_value': self.balance + (self.shares_held * current_price)
-        })
-        
-        self.trade_history.append(trade_info)
+        balances = np.array([self.balance], dtype=np.float64)
+        shares = np.array([self.shares_held], dtype=np.int64)
+        trade_info, = self._trade(np.array([action], dtype=np.float64), np.ones(1, dtype=np.bool_),
+                                  np.array([current_price], dtype=np.float64), balances, shares, now)
+        self.balance = float(balances[0])
+        self.shares_held = int(shares[0])
         return trade_info
     
-    def update_portfolio_log(self, current_price: float):
-        """Log current portfolio state"""
+    def update_portfolio_log(self, current_price: float, now: Optional[datetime] = None):
+        """Log current portfolio state (now: tick time, defaults to the current time)"""
+        now = now or datetime.now()
         portfolio_value = self.balance + (self.shares_held * current_price)
         total_return = (portfolio_value - self.initial_balance) / self.initial_balance
         
         log_entry = {
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': now.isoformat(),
             'price': current_price,
             'balance': self.balance,
             'shares_held': self.shares_held,
@@ -206,73 +593,308 @@ class LiveTrader:
         }
         
         self.portfolio_history.append(log_entry)
+        self._append_log('portfolio', log_entry)
         
-        # Print portfolio status
-        print(f"\n{'='*60}")
-        print(f"Portfolio Status - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print(f"{'='*60}")
-        print(f"Current Price: ₹{current_price:.2f}")
-        print(f"Cash Balance: ₹{self.balance:,.2f}")
-        print(f"Shares Held: {self.shares_held}")
-        print(f"Portfolio Value: ₹{portfolio_value:,.2f}")
-        print(f"Total Return: {total_return*100:.2f}%")
-        print(f"{'='*60}\n")
+        # Portfolio status, as one record written by the listener thread
+        # (f-string for the thousands separators, so only built when enabled)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(f"\n{'='*60}\n"
+                        f"Portfolio Status - {now.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                        f"{'='*60}\n"
+                        f"Current Price: ₹{current_price:.2f}\n"
+                        f"Cash Balance: ₹{self.balance:,.2f}\n"
+                        f"Shares Held: {self.shares_held}\n"
+                        f"Portfolio Value: ₹{portfolio_value:,.2f}\n"
+                        f"Total Return: {total_return*100:.2f}%\n"
+                        f"{'='*60}\n")
     
-    def save_logs(self):
-        """Save trading logs to file"""
-        logs = {
-            'symbol': self.symbol,
-            'initial_balance': self.initial_balance,
-            'paper_trading': self.paper_trading,
-            'portfolio_history': self.portfolio_history,
-            'trade_history': self.trade_history
-        }
-        
-        with open(self.log_file, 'w') as f:
-            json.dump(logs, f, indent=2)
-        
-        print(f"Logs saved to {self.log_file}")
+    def _log_header(self) -> dict:
+        return {'symbol': self.symbol}
     
-    def run_live(self, update_interval: int = 60):
+    def run_live(self, update_interval: int = 60, stream: bool = False):
         """
         Run live trading loop
         
         Args:
             update_interval: Seconds between each trading decision
+            stream: Price trades from Yahoo's WebSocket stream instead of polling
         """
         print(f"\nStarting live trading for {self.symbol}")
         print(f"Update interval: {update_interval} seconds")
+        print(f"Price feed: {'WebSocket stream' if stream else 'polling'}")
         print("Press Ctrl+C to stop\n")
         
+        self._run(self._stream_loop(update_interval) if stream else self._loop(update_interval))
+    
+    async def _loop(self, update_interval: int):
+        """Trading loop; network fetch and inference run off the event loop"""
+        deadline = time.monotonic()
+        while True:
+            # Get current state
+            obs, current_price = await self.get_current_state_async()
+            
+            if obs is None:
+                logger.warning("Failed to get market data, retrying...")
+                deadline = await _sleep_until_next(deadline, update_interval)
+                continue
+            
+            # Get action from model
+            action = await asyncio.to_thread(self._act, obs)
+            
+            # Execute action (one timestamp for the whole tick)
+            now = datetime.now()
+            self.execute_action(action[0], current_price, now)
+            
+            # Update and log portfolio (appended to the NDJSON log)
+            self.update_portfolio_log(current_price, now)
+            
+            # Wait for next update (the cycle's own fetch time counts toward the interval)
+            deadline = await _sleep_until_next(deadline, update_interval)
+    
+    def _on_tick(self, message: dict):
+        """WebSocket handler: queue (timestamp ms, price) ticks for our symbol"""
+        if message.get('id') == self._stream_symbol and 'price' in message:
+            self._tick_queue.put_nowait((int(message.get('time', 0)), float(message['price'])))
+    
+    async def _stream_loop(self, update_interval: int):
+        """
+        Trading loop driven by streamed ticks
+        
+        The features come from daily bars, so the history is only re-fetched
+        when the date changes; every decision in between is priced at the
+        freshest tick, with no HTTP round-trip.
+        """
+        self._stream_symbol = (
+            f"{self.symbol}.NS" if self.indian_stock and not self.symbol.endswith(('.NS', '.BO')) else self.symbol
+        )
+        self._tick_queue = asyncio.Queue()
+        ws, listener = await self._open_stream(update_interval)
+        next_tick = None
+        market_date = None
+        
         try:
             while True:
-                # Get current state
-                obs, current_price = self.get_current_state()
-                
-                if obs is None:
-                    print("Failed to get market data, retrying...")
-                    time.sleep(update_interval)
+                # Wait for a tick, unless the stream dies first
+                if next_tick is None:
+                    next_tick = asyncio.ensure_future(self._tick_queue.get())
+                await asyncio.wait({next_tick, listener}, return_when=asyncio.FIRST_COMPLETED)
+                if not next_tick.done():
+                    error = listener.exception() if not listener.cancelled() else None
+                    logger.warning("Price stream stopped (%r), reconnecting...", error)
+                    await self._close_stream(ws, listener)
+                    ws, listener = await self._open_stream(update_interval)
                     continue
                 
-                # Get action from model
-                action, _ = self.model.predict(obs, deterministic=True)
+                # Skip to the newest tick queued
+                _, current_price = next_tick.result()
+                next_tick = None
+                while not self._tick_queue.empty():
+                    _, current_price = self._tick_queue.get_nowait()
+                deadline = time.monotonic()
                 
-                # Execute action
-                self.execute_action(action[0], current_price)
+                # New day: recompute the feature row once
+                now = datetime.now()
+                today = now.date()
+                if market_date != today:
+                    if not await asyncio.to_thread(self.refresh_market_data):
+                        logger.warning("Failed to get market data, retrying...")
+                        await _sleep_until_next(deadline, update_interval)
+                        continue
+                    market_date = today
                 
-                # Update and log portfolio
-                self.update_portfolio_log(current_price)
+                obs = self.build_state(current_price)
+                action = await asyncio.to_thread(self._act, obs)
+                self.execute_action(action[0], current_price, now)
+                self.update_portfolio_log(current_price, now)
                 
-                # Save logs
-                self.save_logs()
-                
-                # Wait for next update
-                time.sleep(update_interval)
-                
-        except KeyboardInterrupt:
-            print("\n\nStopping live trading...")
-            self.save_logs()
-            print("Final logs saved. Goodbye!")
+                # At most one decision per interval; ticks keep queueing meanwhile
+                await _sleep_until_next(deadline, update_interval)
+        finally:
+            if next_tick is not None:
+                next_tick.cancel()
+            await self._close_stream(ws, listener)
+    
+    async def _open_stream(self, retry_delay: float):
+        """Subscribe to the price stream, retrying until it connects; returns (socket, listener task)"""
+        while True:
+            ws = yf.AsyncWebSocket(verbose=False)
+            try:
+                await ws.subscribe(self._stream_symbol)
+            except Exception as e:
+                logger.warning("Price stream connection failed (%r), retrying...", e)
+                await self._close_stream(ws)
+                await asyncio.sleep(retry_delay)
+                continue
+            return ws, asyncio.create_task(ws.listen(self._on_tick))
+    
+    @staticmethod
+    async def _close_stream(ws, listener: Optional[asyncio.Task] = None):
+        """Stop the listener and close the socket, ignoring errors from a dead connection"""
+        if listener is not None:
+            listener.cancel()
+        try:
+            await ws.close()
+        except Exception as e:
+            logger.debug("Error closing price stream: %r", e)
+
+
+class PortfolioLiveTrader(_LiveTraderBase):
+    """
+    Paper trading of several symbols with one model
+    
+    Each symbol is its own paper account (the model was trained on a single
+    asset). Portfolio state is kept as arrays, so a cycle is one concurrent
+    fetch, one batched predict and one vectorized trade pass for all symbols.
+    """
+    
+    def __init__(self,
+                 model_path: str,
+                 symbols: List[str],
+                 initial_balance: float = 100000.0,
+                 indian_stock: bool = True,
+                 paper_trading: bool = True,
+                 quantize: bool = False):
+        """
+        Initialize portfolio trader
+        
+        Args:
+            model_path: Path to trained model (.zip, or .safetensors from export_policy_weights)
+            symbols: Stock symbols to trade
+            initial_balance: Starting balance of each symbol's paper account
+            indian_stock: Whether trading Indian stocks
+            paper_trading: If True, simulate trades without real execution
+            quantize: Run the policy's Linear layers as dynamic int8 (CPU)
+        """
+        super().__init__(model_path, symbols, 'portfolio', initial_balance, indian_stock, paper_trading, quantize)
+        
+        # Portfolio state, one slot per symbol
+        n = len(self.symbols)
+        self.balances = np.full(n, initial_balance, dtype=np.float64)
+        self.shares = np.zeros(n, dtype=np.int64)
+        self.prices = np.full(n, np.nan, dtype=np.float64)
+        self._market = None  # (n, n_features) float32, latest market row per symbol
+        self._obs = None     # (n, n_features + 4) float32 observation stack
+        
+        print(f"Portfolio Trader initialized for {', '.join(self.symbols)}")
+        print(f"Paper Trading: {paper_trading}")
+        print(f"Initial Balance (per symbol): ₹{initial_balance:,.2f}")
+    
+    def _fetch_row(self, symbol: str):
+        """(float32 market row, price) for one symbol, or None without enough data"""
+        row = self._read_market(symbol)
+        if row is None:
+            return None
+        market_row, bar_close = row
+        return market_row, _latest_price(symbol, self.indian_stock, bar_close)
+    
+    async def refresh_market_data(self) -> np.ndarray:
+        """
+        Fetch every symbol concurrently and update the market rows and prices
+        
+        Returns:
+            Boolean mask of the symbols that have fresh data
+        """
+        rows = await asyncio.gather(*[asyncio.to_thread(self._fetch_row, s) for s in self.symbols])
+        ready = np.array([row is not None for row in rows])
+        for i, row in enumerate(rows):
+            if row is None:
+                continue
+            if self._market is None:
+                self._market = np.zeros((len(self.symbols), row[0].size), dtype=np.float32)
+                self._obs = np.empty((len(self.symbols), row[0].size + 4), dtype=np.float32)
+            self._market[i] = row[0]
+            self.prices[i] = row[1]
+        return ready
+    
+    def build_states(self) -> np.ndarray:
+        """Observation stack for all symbols (same layout as StockTradingEnv)"""
+        n_market = self._market.shape[1]
+        shares_value = self.shares * self.prices
+        portfolio_value = self.balances + shares_value
+        obs = self._obs
+        obs[:, :n_market] = self._market
+        obs[:, n_market] = self.balances / self.initial_balance
+        obs[:, n_market + 1] = shares_value / self.initial_balance
+        obs[:, n_market + 2] = portfolio_value / self.initial_balance
+        obs[:, n_market + 3] = np.divide(shares_value, portfolio_value,
+                                         out=np.zeros_like(portfolio_value), where=portfolio_value > 0)
+        return obs
+    
+    def execute_actions(self, actions: np.ndarray, mask: np.ndarray, now: Optional[datetime] = None):
+        """
+        Execute one action per symbol (same rules as LiveTrader.execute_action)
+        
+        Args:
+            actions: Action per symbol (-1 to 1)
+            mask: Symbols to act on (the others hold)
+            now: Tick time, shared with update_portfolio_log (defaults to the current time)
+        """
+        return self._trade(np.ascontiguousarray(actions, dtype=np.float64), np.ascontiguousarray(mask, dtype=np.bool_),
+                           self.prices, self.balances, self.shares, now)
+    
+    def update_portfolio_log(self, now: Optional[datetime] = None):
+        """Log current portfolio state (now: tick time, defaults to the current time)"""
+        now = now or datetime.now()
+        values = self.balances + self.shares * np.nan_to_num(self.prices)
+        total_value = float(values.sum())
+        total_initial = self.initial_balance * len(self.symbols)
+        total_return = (total_value - total_initial) / total_initial
+        
+        log_entry = {
+            'timestamp': now.isoformat(),
+            'prices': dict(zip(self.symbols, self.prices.tolist())),
+            'balances': dict(zip(self.symbols, self.balances.tolist())),
+            'shares_held': dict(zip(self.symbols, self.shares.tolist())),
+            'portfolio_value': total_value,
+            'total_return': total_return
+        }
+        
+        self.portfolio_history.append(log_entry)
+        self._append_log('portfolio', log_entry)
+        
+        # Portfolio status, as one record written by the listener thread
+        if logger.isEnabledFor(logging.INFO):
+            lines = [f"{symbol}: {shares} shares @ ₹{price:.2f}, value ₹{value:,.2f}"
+                     for symbol, price, shares, value in zip(self.symbols, self.prices, self.shares, values)]
+            logger.info(f"\n{'='*60}\n"
+                        f"Portfolio Status - {now.strftime('%Y-%m-%d %H:%M:%S')}\n"
+                        f"{'='*60}\n"
+                        + '\n'.join(lines) + '\n'
+                        f"Portfolio Value: ₹{total_value:,.2f}\n"
+                        f"Total Return: {total_return*100:.2f}%\n"
+                        f"{'='*60}\n")
+    
+    def run_live(self, update_interval: int = 60):
+        """
+        Run live trading loop
+        
+        Args:
+            update_interval: Seconds between each trading decision
+        """
+        print(f"\nStarting live trading for {', '.join(self.symbols)}")
+        print(f"Update interval: {update_interval} seconds")
+        print("Press Ctrl+C to stop\n")
+        
+        self._run(self._loop(update_interval))
+    
+    async def _loop(self, update_interval: int):
+        """Trading loop: concurrent fetch, one batched predict, one vectorized trade pass"""
+        deadline = time.monotonic()
+        while True:
+            ready = await self.refresh_market_data()
+            if not ready.any():
+                logger.warning("Failed to get market data, retrying...")
+                deadline = await _sleep_until_next(deadline, update_interval)
+                continue
+            
+            obs = self.build_states()
+            actions = await asyncio.to_thread(self._act, obs)
+            now = datetime.now()
+            self.execute_actions(actions[:, 0], ready, now)
+            self.update_portfolio_log(now)
+            
+            # Wait for next update
+            deadline = await _sleep_until_next(deadline, update_interval)
 
 
 def main():
@@ -285,27 +907,54 @@ def main():
     parser.add_argument('--model', type=str, default='./models/final_model.zip',
                        help='Path to trained model')
     parser.add_argument('--symbol', type=str, default='RELIANCE',
-                       help='Stock symbol (e.g., RELIANCE for NSE, TCS, INFY)')
+                       help='Stock symbol, or comma-separated symbols (e.g., RELIANCE or TCS,INFY)')
     parser.add_argument('--balance', type=float, default=100000.0,
                        help='Initial balance for paper trading')
     parser.add_argument('--interval', type=int, default=60,
                        help='Update interval in seconds (default: 60)')
     parser.add_argument('--indian', action='store_true', default=True,
                        help='Trading Indian stocks (NSE/BSE)')
+    parser.add_argument('--stream', action='store_true',
+                       help='Use the Yahoo WebSocket price stream instead of polling')
+    parser.add_argument('--quantize', action='store_true',
+                       help='Run the policy as dynamic int8 on the CPU')
+    parser.add_argument('--export-weights', action='store_true',
+                       help='Write the policy weights next to the model as .safetensors and exit')
     
     args = parser.parse_args()
+    if args.export_weights:
+        print(f"Policy weights written to {export_policy_weights(args.model)}")
+        return
+    
+    symbols = [s.strip() for s in args.symbol.split(',') if s.strip()]
+    if len(symbols) > 1 and args.stream:
+        parser.error('--stream supports a single symbol')
+    
+    if len(symbols) > 1:
+        # One paper account per symbol, traded together
+        trader = PortfolioLiveTrader(
+            model_path=args.model,
+            symbols=symbols,
+            initial_balance=args.balance,
+            indian_stock=args.indian,
+            paper_trading=True,
+            quantize=args.quantize
+        )
+        trader.run_live(update_interval=args.interval)
+        return
     
     # Initialize trader
     trader = LiveTrader(
         model_path=args.model,
-        symbol=args.symbol,
+        symbol=symbols[0],
         initial_balance=args.balance,
         indian_stock=args.indian,
-        paper_trading=True
+        paper_trading=True,
+        quantize=args.quantize
     )
     
     # Run live trading
-    trader.run_live(update_interval=args.interval)
+    trader.run_live(update_interval=args.interval, stream=args.stream)
 
 
 if __name__ == "__main__":